@@ -0,0 +1,47 @@
+"""
+Microbenchmark for encoding a RestCL.get list payload, stdlib json against klotio.service.dumps
+
+    python bench/encode.py [rows] [number]
+"""
+
+import sys
+import json
+import timeit
+
+import klotio.service
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+NUMBER = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+PAYLOAD = {
+    "things": [
+        {
+            "id": row,
+            "name": f"thing{row}",
+            "data": {f"key{key}": f"value{key}" for key in range(10)},
+            "yaml": "".join(f"key{key}: value{key}\n" for key in range(10))
+        }
+        for row in range(ROWS)
+    ]
+}
+
+def before():
+
+    return json.dumps(PAYLOAD)
+
+def after():
+
+    return klotio.service.dumps(PAYLOAD)
+
+if __name__ == "__main__":
+
+    assert json.loads(before()) == json.loads(after())
+
+    print(f"{ROWS} rows, orjson {'on' if klotio.service.orjson is not None else 'off'}")
+
+    for name, function in [
+        ("encode before", before),
+        ("encode after", after)
+    ]:
+        seconds = timeit.timeit(function, number=NUMBER)
+        print(f"{name:<24}{seconds / NUMBER * 1000:8.3f} ms/list")
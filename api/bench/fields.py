@@ -0,0 +1,82 @@
+"""
+Microbenchmark for OPTIONS field building on a resource with many integration fields
+
+    python bench/fields.py [integrations] [subfields] [number]
+"""
+
+import sys
+import copy
+import timeit
+
+import opengui
+
+import klotio.service
+
+INTEGRATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+SUBFIELDS = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+NUMBER = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+
+INTEGRATED = [
+    {
+        "name": f"integration{integration}",
+        "description": f"Integration {integration}",
+        "fields": [
+            {
+                "name": f"field{field}",
+                "options": [f"option{option}" for option in range(10)],
+                "labels": {f"option{option}": f"Option {option}" for option in range(10)},
+                "integrate": {"node": {"role": "worker"}}
+            }
+            for field in range(SUBFIELDS)
+        ]
+    }
+    for integration in range(INTEGRATIONS)
+]
+
+class Bench(klotio.service.Model, klotio.service.RestCL):
+
+    SINGULAR = "bench"
+    FIELDS = [
+        {
+            "name": "name"
+        }
+    ]
+
+    @classmethod
+    def integrations(cls):
+
+        return copy.deepcopy(INTEGRATED)
+
+values = {"name": "bench", "yaml": "a: 1"}
+
+def before():
+
+    fields = opengui.Fields(values, fields=copy.deepcopy(Bench.FIELDS + Bench.integrations() + Bench.YAML))
+    return fields.to_list()
+
+def after():
+
+    return Bench.fields(values).to_list()
+
+def names_before():
+
+    return opengui.Fields({}, {}, Bench.integrations()).names
+
+def names_after():
+
+    return Bench.schema().names
+
+if __name__ == "__main__":
+
+    assert before() == after()
+
+    print(f"{INTEGRATIONS} integrations x {SUBFIELDS} fields, {NUMBER} calls")
+
+    for name, function in [
+        ("fields before", before),
+        ("fields after", after),
+        ("names before", names_before),
+        ("names after", names_after)
+    ]:
+        seconds = timeit.timeit(function, number=NUMBER)
+        print(f"{name:<16}{seconds / NUMBER * 1000:8.3f} ms/call")
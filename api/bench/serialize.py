@@ -0,0 +1,64 @@
+"""
+Microbenchmark for per row YAML serialization in Model.response and the validate -> request path
+
+    python bench/serialize.py [keys] [number]
+"""
+
+import sys
+import timeit
+
+import yaml
+import flask
+
+import klotio.service
+
+KEYS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+NUMBER = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+DATA = {
+    f"key{key}": {
+        "name": f"value{key}",
+        "tags": [f"tag{tag}" for tag in range(5)],
+        "count": key
+    }
+    for key in range(KEYS)
+}
+
+TEXT = yaml.safe_dump(DATA, default_flow_style=False)
+
+app = flask.Flask("klot-io-bench")
+
+def dump_before():
+
+    return yaml.safe_dump(DATA, default_flow_style=False)
+
+def dump_after():
+
+    return klotio.service.dump_yaml(DATA)
+
+def load_before():
+
+    yaml.safe_load(TEXT)
+    return yaml.safe_load(TEXT)
+
+def load_after():
+
+    with app.app_context():
+        klotio.service.load_yaml(TEXT)
+        return klotio.service.load_yaml(TEXT)
+
+if __name__ == "__main__":
+
+    assert dump_before() == dump_after()
+    assert load_before() == load_after()
+
+    print(f"{KEYS} keys per row, {NUMBER} rows, libyaml {'on' if yaml.__with_libyaml__ else 'off'}")
+
+    for name, function in [
+        ("dump before", dump_before),
+        ("dump after", dump_after),
+        ("validate+request before", load_before),
+        ("validate+request after", load_after)
+    ]:
+        seconds = timeit.timeit(function, number=NUMBER)
+        print(f"{name:<24}{seconds / NUMBER * 1000:8.3f} ms/row")
@@ -1,12 +1,71 @@
 import os
+import time
+import threading
 
 import yaml
 import pymysql
 import sqlalchemy
+import sqlalchemy.exc
 import sqlalchemy.orm
+import sqlalchemy.pool
+import sqlalchemy.event
 import sqlalchemy.ext.declarative
+import flask
 import flask_jsontools
 
+class Pool(sqlalchemy.pool.QueuePool):
+    """
+    QueuePool that keeps checkout wait, overflow and timeout counts
+    """
+
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+
+        self.lock = threading.Lock()
+        self.counts = {
+            "checkouts": 0,
+            "waited": 0.0,
+            "overflows": 0,
+            "timeouts": 0
+        }
+
+    def _do_get(self):
+
+        overflow = self.overflow()
+        start = time.perf_counter()
+
+        try:
+            connection = super()._do_get()
+        except sqlalchemy.exc.TimeoutError:
+            with self.lock:
+                self.counts["timeouts"] += 1
+            raise
+
+        with self.lock:
+            self.counts["checkouts"] += 1
+            self.counts["waited"] += time.perf_counter() - start
+            if self.overflow() > overflow and self.overflow() > 0:
+                self.counts["overflows"] += 1
+
+        return connection
+
+    def stats(self):
+
+        with self.lock:
+            counts = dict(self.counts)
+
+        return {
+            "size": self.size(),
+            "checkedin": self.checkedin(),
+            "checkedout": self.checkedout(),
+            "overflow": self.overflow(),
+            "checkouts": counts["checkouts"],
+            "waited": counts["waited"] / counts["checkouts"] if counts["checkouts"] else 0.0,
+            "overflows": counts["overflows"],
+            "timeouts": counts["timeouts"]
+        }
+
 class MySQL(object):
     """
     Main class for interacting with Nandy in MySQL
@@ -16,14 +75,147 @@ class MySQL(object):
 
         self.database = os.environ.get("DATABASE", self.DATABASE)
 
-        self.engine = sqlalchemy.create_engine(
-            f"mysql+pymysql://root@{os.environ['MYSQL_HOST']}:{os.environ['MYSQL_PORT']}/{self.database}"
-        )
+        url = f"mysql+pymysql://root@{os.environ['MYSQL_HOST']}:{os.environ['MYSQL_PORT']}/{self.database}"
+
+        self.engine = self.connect(url)
         self.maker = sqlalchemy.orm.sessionmaker(bind=self.engine)
 
-    def session(self):
+        self.select = os.environ.get("MYSQL_REPLICA_SELECT", "round-robin")
+        self.cooldown = float(os.environ.get("MYSQL_REPLICA_COOLDOWN", 30))
+        self.lock = threading.Lock()
+        self.turn = 0
+        self.replicas = []
+
+        for host in os.environ.get("MYSQL_REPLICAS", "").split(","):
+
+            host = host.strip()
+
+            if not host:
+                continue
+
+            if ":" not in host:
+                host = f"{host}:{os.environ['MYSQL_PORT']}"
+
+            engine = self.connect(f"mysql+pymysql://root@{host}/{self.database}", readonly=True)
+
+            self.replicas.append({
+                "host": host,
+                "engine": engine,
+                "maker": sqlalchemy.orm.sessionmaker(bind=engine, autocommit=True),
+                "unhealthy": 0.0
+            })
+
+        self.warm(int(os.environ.get("MYSQL_POOL_WARM", 0)))
+
+    @staticmethod
+    def pooling():
+
+        return {
+            "poolclass": Pool,
+            "pool_size": int(os.environ.get("MYSQL_POOL_SIZE", 5)),
+            "max_overflow": int(os.environ.get("MYSQL_MAX_OVERFLOW", 10)),
+            "pool_timeout": float(os.environ.get("MYSQL_POOL_TIMEOUT", 30)),
+            "pool_recycle": int(os.environ.get("MYSQL_POOL_RECYCLE", 3600)),
+            "pool_pre_ping": os.environ.get("MYSQL_POOL_PRE_PING", "true").lower() == "true"
+        }
+
+    @staticmethod
+    def roundtrip(*args, **kwargs):
+
+        if flask.has_app_context():
+            flask.g.roundtrips = flask.g.get("roundtrips", 0) + 1
+
+    @classmethod
+    def reset(cls, connection, record):
+
+        # a transaction still open on return rolls back through the engine, counted there
+
+        if getattr(connection, "_reset_agent", None) is None:
+            cls.roundtrip()
 
-        return self.maker()
+    @classmethod
+    def connect(cls, url, readonly=False):
+
+        options = cls.pooling()
+
+        if readonly:
+            options["isolation_level"] = "AUTOCOMMIT"
+            options["pool_reset_on_return"] = None
+
+        engine = sqlalchemy.create_engine(url, **options)
+
+        for event in ["before_cursor_execute", "commit", "rollback"]:
+            sqlalchemy.event.listen(engine, event, cls.roundtrip)
+
+        if not readonly:
+            sqlalchemy.event.listen(engine.pool, "reset", cls.reset)
+
+        return engine
+
+    def warm(self, count):
+
+        for engine in [self.engine] + [replica["engine"] for replica in self.replicas]:
+
+            connections = []
+
+            try:
+                for _ in range(min(count, engine.pool.size())):
+                    connections.append(engine.connect())
+            finally:
+                for connection in connections:
+                    connection.close()
+
+    def stats(self):
+
+        return {
+            **self.engine.pool.stats(),
+            "replicas": {
+                replica["host"]: {
+                    **replica["engine"].pool.stats(),
+                    "healthy": replica["unhealthy"] <= time.monotonic()
+                } for replica in self.replicas
+            }
+        }
+
+    def replica(self):
+
+        now = time.monotonic()
+
+        with self.lock:
+
+            healthy = [replica for replica in self.replicas if replica["unhealthy"] <= now]
+
+            if not healthy:
+                return None
+
+            if self.select == "least-connections":
+                return min(healthy, key=lambda replica: replica["engine"].pool.checkedout())
+
+            self.turn += 1
+
+            return healthy[self.turn % len(healthy)]
+
+    def fail(self, replica):
+
+        with self.lock:
+            replica["unhealthy"] = time.monotonic() + self.cooldown
+
+    def session(self, readonly=False, replica=True):
+
+        if not readonly:
+            return self.maker()
+
+        replica = self.replica() if replica else None
+
+        if replica is None:
+            session = self.maker()
+            session.info["readonly"] = True
+            return session
+
+        session = replica["maker"]()
+        session.info["replica"] = replica
+
+        return session
 
     @classmethod
     def create_database(cls):
@@ -61,4 +253,14 @@ class MySQL(object):
 
             connection.close()
 
+    @staticmethod
+    def generated(key, type=None, column="data"):
+
+        return sqlalchemy.Column(
+            key,
+            type if type is not None else sqlalchemy.String(255),
+            sqlalchemy.Computed(f"JSON_UNQUOTE(JSON_EXTRACT(`{column}`, '$.\"{key}\"'))"),
+            index=True
+        )
+
     Base = sqlalchemy.ext.declarative.declarative_base(cls=(flask_jsontools.JsonSerializableBase))
@@ -1,32 +1,325 @@
 import os
+import re
 import glob
 import copy
 import json
+import math
+import time
+import zlib
+import decimal
+import datetime
+import collections.abc
+import queue
 import yaml
+import base64
+import hashlib
 import requests
 import functools
+import threading
 import traceback
+import urllib.parse
+import requests.adapters
+import concurrent.futures
 
 import flask
 import flask_restful
+import sqlalchemy
 import sqlalchemy.exc
+import sqlalchemy.orm
+import sqlalchemy.sql.operators
 
 import opengui
 
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def default(value):
+
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+
+    if isinstance(value, collections.abc.Mapping):
+        return dict(value)
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(data):
+
+    if orjson is not None:
+        return orjson.dumps(data, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    return json.dumps(data, default=default)
+
+def output_json(data, code, headers=None):
+
+    response = flask.make_response(dumps(data) + "\n", code)
+    response.headers.extend(headers or {})
+    response.headers["Content-Type"] = "application/json"
+
+    return response
+
+COMPRESS_MIN = int(os.environ.get("COMPRESS_MIN", 1024))
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))
+COMPRESS_BROTLI = int(os.environ.get("COMPRESS_BROTLI", 4))
+
+class Compressor:
+    """
+    Incremental gzip, deflate or brotli compression of response chunks
+    """
+
+    def __init__(self, encoding, level=None, quality=None):
+
+        self.encoding = encoding
+
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=COMPRESS_BROTLI if quality is None else quality)
+        else:
+            self.compressor = zlib.compressobj(
+                COMPRESS_LEVEL if level is None else level,
+                zlib.DEFLATED,
+                zlib.MAX_WBITS + 16 if encoding == "gzip" else zlib.MAX_WBITS
+            )
+
+    def compress(self, data):
+
+        if self.encoding == "br":
+            return self.compressor.process(data)
+
+        return self.compressor.compress(data)
+
+    def flush(self):
+
+        if self.encoding == "br":
+            return self.compressor.finish()
+
+        return self.compressor.flush()
+
+def encoding():
+
+    encodings = (["br"] if brotli is not None else []) + ["gzip", "deflate"]
+
+    return flask.request.accept_encodings.best_match(encodings)
+
+def compressed(chunks, compressor, closing):
+
+    try:
+
+        for chunk in chunks:
+
+            data = compressor.compress(chunk)
+
+            if data:
+                yield data
+
+        yield compressor.flush()
+
+    finally:
+
+        if hasattr(closing, "close"):
+            closing.close()
+
+def compress(response):
+
+    if (
+        COMPRESS_LEVEL <= 0 or
+        flask.request.method == "HEAD" or
+        response.status_code < 200 or response.status_code in (204, 304) or
+        response.direct_passthrough or
+        "Content-Encoding" in response.headers or
+        response.mimetype == "text/event-stream"
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    negotiated = encoding()
+
+    if negotiated is None:
+        return response
+
+    compressor = Compressor(negotiated)
+
+    if response.is_streamed:
+
+        response.response = compressed(response.iter_encoded(), compressor, response.response)
+        response.headers.pop("Content-Length", None)
+
+    else:
+
+        data = response.get_data()
+
+        if len(data) < COMPRESS_MIN:
+            return response
+
+        response.set_data(compressor.compress(data) + compressor.flush())
+
+    response.headers["Content-Encoding"] = negotiated
+
+    etag, weak = response.get_etag()
+
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+    return response
+
+def conditional(response):
+
+    if (
+        flask.request.method != "GET" or
+        response.status_code != 200 or
+        response.is_streamed or
+        response.direct_passthrough or
+        "ETag" in response.headers or
+        response.mimetype != "application/json"
+    ):
+        return response
+
+    response.add_etag()
+
+    return response.make_conditional(flask.request)
+
+class Api(flask_restful.Api):
+    """
+    flask_restful Api that encodes JSON with orjson when it's installed, tags and compresses responses
+    """
+
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+
+        self.representations["application/json"] = output_json
+
+    def init_app(self, app):
+
+        super().init_app(app)
+
+        app.after_request(compress)
+        app.after_request(conditional)
+
+
+READS = ["GET", "HEAD", "OPTIONS"]
+PRIMARY = "klotio-primary"
+STICKY = int(os.environ.get("MYSQL_STICKY", 5))
+
+def reading():
+
+    return (
+        flask.request.method in READS and
+        not flask.request.headers.get("X-Read-Primary") and
+        not flask.request.cookies.get(PRIMARY)
+    )
+
+def sticky(response):
+
+    if response.status_code < 400:
+        response.set_cookie(PRIMARY, "1", max_age=STICKY, httponly=True)
+
+    return response
+
+def roundtrips(response):
+
+    response.headers["X-DB-Roundtrips"] = str(flask.g.get("roundtrips", 0))
+
+    return response
+
+class LazySession:
+    """
+    Stands in for a session, only opening one when it's first used
+    """
+
+    def __init__(self, mysql, readonly=False):
+
+        self.mysql = mysql
+        self.readonly = readonly
+        self.replica = True
+        self.opened = None
+
+    def __getattr__(self, name):
+
+        if self.opened is None:
+            self.opened = self.mysql.session(readonly=self.readonly, replica=self.replica)
+
+        return getattr(self.opened, name)
+
+    def rollback(self):
+
+        if self.opened is not None:
+            self.opened.rollback()
+
+    def close(self):
+
+        if self.opened is not None:
+            self.opened.close()
+
+def primary():
+
+    # reads that fill shared caches stay off replicas that may lag a version bump
+
+    if isinstance(flask.request.session, LazySession) and flask.request.session.opened is None:
+        flask.request.session.replica = False
+
+def replicated():
+
+    return "replica" in flask.request.session.info
+
+def commit():
+
+    if not flask.request.session.autocommit and not flask.request.session.info.get("readonly"):
+        flask.request.session.commit()
 
 def require_session(endpoint):
     @functools.wraps(endpoint)
     def wrap(*args, **kwargs):
 
-        flask.request.session = flask.current_app.mysql.session()
+        mysql = flask.current_app.mysql
+        readonly = reading()
+
+        flask.request.session = LazySession(mysql, readonly)
+        flask.g.roundtrips = 0
+        flask.after_this_request(roundtrips)
+
+        if flask.request.method not in READS and STICKY and mysql.replicas:
+            flask.after_this_request(sticky)
 
         try:
 
-            response = endpoint(*args, **kwargs)
+            try:
+
+                response = endpoint(*args, **kwargs)
+
+            except sqlalchemy.exc.DBAPIError as exception:
+
+                if (
+                    not readonly or
+                    not exception.connection_invalidated or
+                    "replica" not in flask.request.session.info
+                ):
+                    raise
+
+                mysql.fail(flask.request.session.info["replica"])
+                flask.request.session.close()
+                flask.request.session = LazySession(mysql)
+
+                response = endpoint(*args, **kwargs)
 
         except sqlalchemy.exc.InvalidRequestError:
 
-            response = flask.make_response(json.dumps({
+            response = flask.make_response(dumps({
                 "message": "session error",
                 "traceback": traceback.format_exc()
             }))
@@ -37,16 +330,39 @@ def require_session(endpoint):
 
         except Exception as exception:
 
-            response = flask.make_response(json.dumps({"message": str(exception)}))
+            response = flask.make_response(dumps({"message": str(exception)}))
             response.headers.set('Content-Type', 'application/json')
             response.status_code = 500
 
-        flask.request.session.close()
+        if isinstance(response, flask.Response) and response.is_streamed:
+            response.call_on_close(flask.request.session.close)
+        else:
+            flask.request.session.close()
 
         return response
 
     return wrap
 
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+def load_yaml(text):
+
+    if not flask.has_app_context() or not isinstance(text, str):
+        return yaml.load(text, Loader=Loader)
+
+    if "yaml" not in flask.g:
+        flask.g.yaml = {}
+
+    if text not in flask.g.yaml:
+        flask.g.yaml[text] = yaml.load(text, Loader=Loader)
+
+    return flask.g.yaml[text]
+
+def dump_yaml(data):
+
+    return yaml.dump(data, Dumper=Dumper, default_flow_style=False)
+
 def validate(fields):
 
     valid = fields.validate()
@@ -56,123 +372,1385 @@ def validate(fields):
         if field.name != "yaml" or field.value is None:
             continue
 
-        if not isinstance(yaml.safe_load(field.value), dict):
+        if not isinstance(load_yaml(field.value), dict):
             field.errors.append("must be dict")
             valid = False
 
     return valid
 
+class Publisher(threading.Thread):
+    """
+    Publishes queued messages to redis in pipelined batches, off the request path
+    """
+
+    def __init__(self, redis, channel, size=None, window=None, batch=None):
+
+        super().__init__(daemon=True)
+
+        self.redis = redis
+        self.channel = channel
+        self.window = float(os.environ.get("PUBLISH_WINDOW", 0.05)) if window is None else window
+        self.batch = int(os.environ.get("PUBLISH_BATCH", 100)) if batch is None else batch
+        self.retries = int(os.environ.get("PUBLISH_RETRIES", 3))
+
+        self.size = int(os.environ.get("PUBLISH_QUEUE", 1000)) if size is None else size
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.reserved = set()
+
+        self.published = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+
+        self.start()
+
+    def count(self, kind, amount=1):
+
+        with self.lock:
+            setattr(self, kind, getattr(self, kind) + amount)
+
+    def put(self, message):
+
+        with self.lock:
+
+            if self.queue.qsize() < self.size:
+                self.queue.put_nowait(message)
+                return True
+
+            if "invalidate" in message:
+                reserved = ("invalidate", message["invalidate"])
+            elif "model" in message:
+                self.dropped += 1
+                reserved = ("resync", message["model"])
+            else:
+                self.dropped += 1
+                return False
+
+            if reserved in self.reserved:
+                self.coalesced += 1
+            elif reserved[0] == "invalidate":
+                self.reserved.add(reserved)
+                self.queue.put_nowait(message)
+            else:
+                self.reserved.add(reserved)
+                self.queue.put_nowait({"model": reserved[1], "action": "resync", "id": None})
+
+            return reserved[0] == "invalidate"
+
+    def release(self, message):
+
+        if "invalidate" in message:
+            reserved = ("invalidate", message["invalidate"])
+        elif message.get("action") == "resync":
+            reserved = ("resync", message.get("model"))
+        else:
+            return
+
+        with self.lock:
+            self.reserved.discard(reserved)
+
+    @staticmethod
+    def identity(message):
+
+        if message.get("action") == "update":
+            return ("update", message.get("model"), message.get("id"))
+
+        if "invalidate" in message:
+            return ("invalidate", message["invalidate"])
+
+        return None
+
+    def collect(self):
+
+        pending = [self.queue.get()]
+        index = {}
+        taken = 1
+
+        self.release(pending[0])
+
+        if self.identity(pending[0]) is not None:
+            index[self.identity(pending[0])] = 0
+
+        deadline = time.monotonic() + self.window
+
+        while len(pending) < self.batch:
+
+            try:
+                message = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+
+            taken += 1
+            identity = self.identity(message)
+
+            self.release(message)
+
+            if identity is not None and identity in index:
+                pending[index[identity]] = message
+                self.count("coalesced")
+                continue
+
+            if "model" in message:
+                index.pop(("update", message["model"], message.get("id")), None)
+
+            if identity is not None:
+                index[identity] = len(pending)
+
+            pending.append(message)
+
+        return pending, taken
+
+    def publish(self, pending):
+
+        for attempt in range(self.retries + 1):
+
+            try:
+
+                pipeline = self.redis.pipeline(transaction=False)
+
+                for message in pending:
+                    pipeline.publish(self.channel, json.dumps(message))
+
+                pipeline.execute()
+
+                self.count("published", len(pending))
+                self.count("batches")
+
+                return True
+
+            except Exception:
+
+                self.count("errors")
+                time.sleep(min(0.1 * 2 ** attempt, 1))
+
+        return False
+
+    def run(self):
+
+        while True:
+
+            pending, taken = self.collect()
+
+            try:
+                self.publish(pending)
+            finally:
+                for _ in range(taken):
+                    self.queue.task_done()
+
+    def flush(self):
+
+        self.queue.join()
+
+    def stats(self):
+
+        with self.lock:
+            return {
+                "queued": self.queue.qsize(),
+                "published": self.published,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "errors": self.errors
+            }
+
+publishing = threading.Lock()
+
+def publisher():
+
+    app = flask.current_app
+
+    if "klotio.publisher" not in app.extensions:
+        with publishing:
+            if "klotio.publisher" not in app.extensions:
+                app.extensions["klotio.publisher"] = Publisher(app.redis, app.channel)
+
+    return app.extensions["klotio.publisher"]
+
 def notify(message):
 
-    flask.current_app.redis.publish(flask.current_app.channel, json.dumps(message))
+    return publisher().put(message)
+
+class Watcher(threading.Thread):
+    """
+    Bumps a generation whenever anything in a directory changes
+    """
+
+    FLAGS = [
+        "CREATE",
+        "DELETE",
+        "MODIFY",
+        "ATTRIB",
+        "CLOSE_WRITE",
+        "MOVED_FROM",
+        "MOVED_TO"
+    ]
 
-class Health(flask_restful.Resource):
-    def get(self):
-        return {"message": "OK"}
+    def __init__(self, path):
+
+        super().__init__(daemon=True)
+
+        self.generation = 0
+        self.inotify = inotify_simple.INotify()
+
+        flags = 0
+
+        for flag in self.FLAGS:
+            flags |= getattr(inotify_simple.flags, flag)
+
+        self.inotify.add_watch(path, flags)
+
+    def run(self):
+
+        while True:
+            if self.inotify.read():
+                self.generation += 1
+
+class Integrations:
+    """
+    Process level cache of parsed integration files, per model
+    """
+
+    def __init__(self, path="/opt/service/config"):
+
+        self.path = path
+        self.lock = threading.Lock()
+        self.watcher = None
+        self.clear()
+
+    def clear(self):
+
+        with self.lock:
+            self.entries = {}
+            self.hits = 0
+            self.misses = 0
+
+    def watch(self):
+
+        if inotify_simple is None:
+            return False
+
+        with self.lock:
+            if self.watcher is None:
+                self.watcher = Watcher(self.path)
+                self.watcher.start()
+
+        return True
+
+    @staticmethod
+    def stamp(paths):
+
+        stamps = []
+
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                stamps.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append((path, None, None))
+
+        return tuple(stamps)
+
+    @staticmethod
+    def parse(paths):
+
+        parsed = []
+
+        for integration_path in paths:
+            with open(integration_path, "r") as integration_file:
+                parsed.append({**{"name": os.path.basename(integration_path).split("_")[1], **load_yaml(integration_file)}})
+
+        return parsed
+
+    def entry(self, singular):
+
+        generation = self.watcher.generation if self.watcher is not None else None
+
+        with self.lock:
+
+            entry = self.entries.get(singular)
+
+            if entry is not None and generation is not None and entry["generation"] == generation:
+                self.hits += 1
+                return entry
+
+        paths = sorted(glob.glob(f"{self.path}/integration_*_{singular}.fields.yaml"))
+        stamp = self.stamp(paths)
+
+        with self.lock:
+
+            entry = self.entries.get(singular)
+
+            if entry is not None and entry["stamp"] == stamp:
+                entry["generation"] = generation
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+
+        entry = {
+            "stamp": stamp,
+            "generation": generation,
+            "integrations": self.parse(paths)
+        }
+
+        with self.lock:
+            self.entries[singular] = entry
+
+        return entry
+
+    def peek(self, singular):
+
+        with self.lock:
+            return self.entries.get(singular)
+
+    def get(self, singular):
+
+        return copy.deepcopy(self.entry(singular)["integrations"])
+
+    def stats(self):
+
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "models": len(self.entries),
+                "watching": self.watcher is not None
+            }
+
+integrations = Integrations()
+
+class Client:
+    """
+    Shared keep-alive HTTP client with pooling, retries and per host stats
+    """
+
+    def __init__(self, size=None, timeout=None, retries=None, backoff=None):
+
+        self.size = size if size is not None else int(os.environ.get("HTTP_POOL_SIZE", 10))
+        self.timeout = timeout if timeout is not None else float(os.environ.get("HTTP_TIMEOUT", 5))
+        self.retries = retries if retries is not None else int(os.environ.get("HTTP_RETRIES", 2))
+        self.backoff = backoff if backoff is not None else float(os.environ.get("HTTP_BACKOFF", 0.1))
+
+        self.adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.size,
+            pool_maxsize=self.size,
+            max_retries=requests.adapters.Retry(
+                total=self.retries,
+                backoff_factor=self.backoff,
+                status_forcelist=[502, 503, 504],
+                raise_on_status=False
+            )
+        )
+
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self.single = requests.adapters.HTTPAdapter(
+            pool_connections=self.size,
+            pool_maxsize=self.size,
+            max_retries=0
+        )
+
+        self.once = requests.Session()
+        self.once.mount("http://", self.single)
+        self.once.mount("https://", self.single)
+
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def request(self, method, url, retry=True, **kwargs):
+
+        kwargs.setdefault("timeout", self.timeout)
+
+        host = urllib.parse.urlparse(url).hostname
+        start = time.perf_counter()
+        error = False
+
+        try:
+            return (self.session if retry else self.once).request(method, url, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            with self.lock:
+                stats = self.hosts.setdefault(host, {"requests": 0, "errors": 0, "seconds": 0.0})
+                stats["requests"] += 1
+                stats["errors"] += int(error)
+                stats["seconds"] += time.perf_counter() - start
+
+    def get(self, url, **kwargs):
+
+        return self.request("GET", url, **kwargs)
+
+    def options(self, url, **kwargs):
+
+        return self.request("OPTIONS", url, **kwargs)
+
+    def stats(self):
+
+        connections = {}
+
+        for adapter in [self.adapter, self.single]:
+
+            for key in adapter.poolmanager.pools.keys():
+
+                pool = adapter.poolmanager.pools.get(key)
+
+                if pool is None:
+                    continue
+
+                host = connections.setdefault(pool.host, {"connections": 0, "reused": 0})
+                host["connections"] += pool.num_connections
+                host["reused"] += max(pool.num_requests - pool.num_connections, 0)
+
+        stats = {}
+
+        with self.lock:
+            for host, counts in self.hosts.items():
+                stats[host] = {
+                    "requests": counts["requests"],
+                    "errors": counts["errors"],
+                    "latency": counts["seconds"] / counts["requests"] if counts["requests"] else 0.0,
+                    **connections.get(host, {"connections": 0, "reused": 0})
+                }
+
+        return stats
+
+client = Client()
+
+def cache_control(headers):
+
+    control = {}
+
+    for directive in headers.get("Cache-Control", "").split(","):
+
+        name, _, value = directive.strip().lower().partition("=")
+        value = value.strip().strip('"')
+
+        if name == "no-store":
+            control["store"] = False
+        elif name == "no-cache":
+            control["ttl"] = 0
+        elif not re.match(r"^[0-9]+$", value):
+            continue
+        elif name == "max-age":
+            control["ttl"] = int(value)
+        elif name == "stale-while-revalidate":
+            control["stale"] = int(value)
+
+    return control
+
+class Cache:
+    """
+    TTL cache that serves stale entries while refreshing them in the background
+    """
+
+    def __init__(self, ttl, stale=0, fallback=False, interval=None):
+
+        self.ttl = ttl
+        self.stale = stale
+        self.fallback = fallback
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.warmer = None
+        self.clear()
+
+    def clear(self):
+
+        with self.lock:
+            self.entries = {}
+            self.refreshing = set()
+            self.flights = {}
+            self.kept = {}
+            self.generation = 0
+            self.hits = 0
+            self.stales = 0
+            self.misses = 0
+
+    def refresh(self, key, fetch, previous=None):
+
+        try:
+            fetched = fetch(previous)
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+        now = time.monotonic()
+
+        entry = {
+            "value": fetched["value"],
+            "etag": fetched.get("etag"),
+            "fetched": now,
+            "expires": now + fetched.get("ttl", self.ttl)
+        }
+
+        entry["stale"] = entry["expires"] + fetched.get("stale", self.stale)
+
+        if fetched.get("store", True):
+            with self.lock:
+                if key not in self.entries or self.entries[key]["value"] != entry["value"]:
+                    self.generation += 1
+                self.entries[key] = entry
+
+        return entry
+
+    def background(self, key, fetch, previous):
+
+        try:
+            self.refresh(key, fetch, previous)
+        except Exception:
+            pass
+
+    def lookup(self, key, fetch):
+
+        now = time.monotonic()
+
+        with self.lock:
+
+            entry = self.entries.get(key)
+
+            if entry is None or (now >= entry["stale"] and not self.fallback):
+                return None
+
+            if now < entry["expires"]:
+                self.hits += 1
+                return entry
+
+            self.stales += 1
+
+            if key in self.refreshing:
+                return entry
+
+            self.refreshing.add(key)
+
+        threading.Thread(target=self.background, args=(key, fetch, entry), daemon=True).start()
+
+        return entry
+
+    def entry(self, key, fetch):
+
+        entry = self.lookup(key, fetch)
+
+        if entry is not None:
+            return entry
+
+        with self.lock:
+
+            self.misses += 1
+            previous = self.entries.get(key)
+            flight = self.flights.get(key)
+
+            leader = flight is None
+
+            if leader:
+                flight = self.flights[key] = {"event": threading.Event()}
+
+        if not leader:
+
+            flight["event"].wait()
+
+            if "error" in flight:
+                raise flight["error"]
+
+            return flight["entry"]
+
+        try:
+            flight["entry"] = self.refresh(key, fetch, previous)
+        except Exception as exception:
+            if self.fallback and previous is not None:
+                flight["entry"] = previous
+            else:
+                flight["error"] = exception
+                raise
+        finally:
+            with self.lock:
+                self.flights.pop(key, None)
+            flight["event"].set()
+
+        return flight["entry"]
+
+    def get(self, key, fetch):
+
+        return self.entry(key, fetch)["value"]
+
+    def drop(self, prefix):
+
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+
+    def keep(self, key, fetch):
+
+        with self.lock:
+
+            self.kept[key] = fetch
+
+            if self.warmer is None and self.interval:
+                self.warmer = threading.Thread(target=self.warming, daemon=True)
+                self.warmer.start()
+
+    def warm(self):
+
+        with self.lock:
+            kept = list(self.kept.items())
+
+        for key, fetch in kept:
+
+            with self.lock:
+                previous = self.entries.get(key)
+
+            self.background(key, fetch, previous)
+
+    def warming(self):
+
+        while True:
+            time.sleep(self.interval)
+            self.warm()
+
+    def stats(self):
+
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "stales": self.stales,
+                "misses": self.misses,
+                "entries": len(self.entries)
+            }
+
+derivations = Cache(
+    ttl=float(os.environ.get("DERIVE_TTL", 60)),
+    stale=float(os.environ.get("DERIVE_STALE", 300))
+)
+
+groups = Cache(
+    ttl=float(os.environ.get("GROUP_TTL", 30)),
+    stale=float(os.environ.get("GROUP_STALE", 300)),
+    fallback=True,
+    interval=float(os.environ.get("GROUP_REFRESH", 15))
+)
+
+integrators = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.environ.get("INTEGRATE_WORKERS", 4)),
+    thread_name_prefix="integrate"
+)
+
+class Health(flask_restful.Resource):
+    def get(self):
+        return {"message": "OK"}
+
+class Stats(flask_restful.Resource):
+    def get(self):
+
+        stats = {
+            "integrations": integrations.stats(),
+            "derivations": derivations.stats(),
+            "groups": groups.stats(),
+            "choices": choices.stats(),
+            "responses": response_cache.stats(),
+            "http": client.stats()
+        }
+
+        if hasattr(flask.current_app, "mysql"):
+            stats["mysql"] = flask.current_app.mysql.stats()
+
+        if "klotio.publisher" in flask.current_app.extensions:
+            stats["publisher"] = flask.current_app.extensions["klotio.publisher"].stats()
+
+        return stats
+
+class Group(flask_restful.Resource):
+
+    @classmethod
+    def member(cls, previous=None):
+
+        response = client.get(f"http://api.klot-io/app/{cls.APP}/member")
+
+        response.raise_for_status()
+
+        return {"value": response.json()}
+
+    def get(self):
+
+        groups.keep(self.APP, self.member)
+
+        entry = groups.entry(self.APP, self.member)
+
+        return {"group": entry["value"]}, 200, {"Age": str(int(time.monotonic() - entry["fetched"]))}
+
+class Schema:
+    """
+    Compiled field definitions for a model, shared read only across requests
+    """
+
+    def __init__(self, fields, integrations):
+
+        self.entry = None
+        self.generation = None
+        self.verified = 0
+        self.integrations = integrations
+        self.fields = tuple(copy.deepcopy(fields))
+        self.lookup = {field["name"]: field for field in self.fields}
+        self.names = frozenset(integration["name"] for integration in integrations)
+
+    @staticmethod
+    def thaw(field):
+
+        thawed = dict(field)
+
+        for key in ["content", "errors"]:
+            if key in thawed:
+                thawed[key] = copy.copy(thawed[key])
+
+        if "fields" in thawed:
+            thawed["fields"] = [Schema.thaw(child) for child in thawed["fields"]]
+
+        return thawed
+
+    def build(self, values=None, originals=None, prefix=None):
+
+        fields = [self.thaw(field) for field in (prefix or [])]
+        fields.extend(self.thaw(field) for field in self.fields)
+
+        return opengui.Fields(values, originals=originals, fields=fields)
+
+schemas = {}
+
+choices = Cache(ttl=float(os.environ.get("CHOICES_TTL", 60)))
+
+class ResponseCache:
+    """
+    Rendered GET responses kept in redis under a per resource version
+    """
+
+    def __init__(self):
+
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.errors = 0
+
+    def count(self, kind):
+
+        with self.lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+
+    @staticmethod
+    def version(singular):
+
+        return f"{flask.current_app.channel}/{singular}"
+
+    def key(self, singular, id=None):
+
+        try:
+            version = int(flask.current_app.redis.get(self.version(singular)) or 0)
+        except Exception:
+            self.count("errors")
+            return None
+
+        arguments = urllib.parse.urlencode(sorted(flask.request.args.items(multi=True)))
+
+        return f"{self.version(singular)}/{version}/{'' if id is None else id}?{arguments}"
+
+    def get(self, key):
+
+        if key is None:
+            return None
+
+        try:
+            entry = flask.current_app.redis.get(key)
+        except Exception:
+            self.count("errors")
+            return None
+
+        if entry is None:
+            self.count("misses")
+            return None
+
+        self.count("hits")
+
+        return json.loads(entry)
+
+    def set(self, key, ttl, entry):
+
+        if key is None:
+            return
+
+        try:
+            flask.current_app.redis.setex(key, ttl, dumps(entry))
+        except Exception:
+            self.count("errors")
+
+    def invalidate(self, singular):
+
+        try:
+            flask.current_app.redis.incr(self.version(singular))
+        except Exception:
+            self.count("errors")
+
+    def stats(self):
+
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "ratio": self.hits / lookups if lookups else 0.0
+            }
+
+response_cache = ResponseCache()
+
+class Listener:
+    """
+    Single redis subscription per process, handing channel messages to handlers
+    """
+
+    def __init__(self):
+
+        self.lock = threading.Lock()
+        self.handlers = []
+        self.pubsub = None
+        self.thread = None
+
+    def handle(self, handler):
+
+        self.handlers.append(handler)
+
+    def unhandle(self, handler):
+
+        if handler in self.handlers:
+            self.handlers.remove(handler)
+
+    def listen(self, redis, channel):
+
+        with self.lock:
+
+            if self.thread is not None:
+                return
+
+            self.pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            self.pubsub.subscribe(channel)
+
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def run(self):
+
+        while True:
+            try:
+                for message in self.pubsub.listen():
+                    self.dispatch(message)
+            except Exception:
+                time.sleep(1)
+
+    def dispatch(self, message):
+
+        if message.get("type") != "message":
+            return
+
+        try:
+            data = json.loads(message["data"])
+        except ValueError:
+            return
+
+        for handler in list(self.handlers):
+            try:
+                handler(data)
+            except Exception:
+                pass
+
+listener = Listener()
+
+class Model:
+
+    YAML = [
+        {
+            "name": "yaml",
+            "style": "textarea",
+            "optional": True
+        }
+    ]
+
+    TIMEOUT = float(os.environ.get("INTEGRATE_TIMEOUT", 5))
+    DEADLINE = float(os.environ.get("INTEGRATE_DEADLINE", 10))
+    VERIFY = float(os.environ.get("SCHEMA_VERIFY", 5))
+
+    RESERVED = ["limit", "after", "stream", "fields", "sort", "count", "count_by"]
+
+    FILTERS = []
+
+    OPERATORS = ["in", "ne", "gt", "gte", "lt", "lte", "like", "prefix", "null"]
+
+    LABEL = "name"
+
+    CHUNK = int(os.environ.get("STREAM_CHUNK", 100))
+
+    LIST_YAML = False
+
+    VERSION = None
+
+    CACHE = None
+
+    @staticmethod
+    def validate(fields):
+
+        return validate(fields)
+
+    @staticmethod
+    def etag(*parts):
+
+        return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def unmodified(tag):
+
+        return tag is not None and flask.request.if_none_match.contains_weak(tag)
+
+    @classmethod
+    def tagged(cls, tag, response, status=200, headers=None):
+
+        headers = {**(headers or {}), "Cache-Control": "no-cache"}
+
+        if tag is not None:
+            headers["ETag"] = f'"{tag}"'
+
+        if cls.unmodified(tag):
+            return flask.Response(status=304, headers=headers)
+
+        return response, status, headers
+
+    @classmethod
+    def cached(cls, id=None):
+
+        if not cls.CACHE:
+            return None, None
+
+        key = response_cache.key(cls.SINGULAR, id)
+        entry = response_cache.get(key)
+
+        if key is not None and entry is None:
+            primary()
+
+        return key, entry
+
+    @classmethod
+    def cache(cls, key, tag, response, status=200, headers=None):
+
+        if key is not None and status == 200 and not replicated():
+            response_cache.set(key, cls.CACHE, {"tag": tag, "response": response, "headers": headers or {}})
+
+        return cls.tagged(tag, response, status, headers)
+
+    @classmethod
+    def extract(cls, key, unquote=True):
+
+        if not re.match(r"^[\w-]+$", key):
+            raise ValueError(f"invalid data key '{key}'")
+
+        columns = cls.MODEL.__table__.columns
+
+        if key in columns and columns[key].computed is not None:
+            return columns[key]
+
+        extracted = sqlalchemy.func.json_extract(cls.MODEL.data, f'$."{key}"')
+
+        return sqlalchemy.func.json_unquote(extracted) if unquote else extracted
+
+    @staticmethod
+    def number(value):
+
+        if re.match(r"^-?\d+$", value):
+            return int(value)
+
+        if re.match(r"^-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$", value) and math.isfinite(float(value)):
+            return float(value)
+
+        return None
+
+    @classmethod
+    def ranged(cls, field, value):
+
+        number = cls.number(value)
+
+        if field.startswith("data.") and number is not None:
+            return cls.extract(field[5:], unquote=False), number
+
+        return cls.column(field), value
+
+    @classmethod
+    def column(cls, name):
+
+        if name.startswith("data."):
+            return cls.extract(name[5:])
+
+        if name not in cls.MODEL.__table__.columns:
+            raise ValueError(f"invalid filter '{name}'")
+
+        return cls.MODEL.__table__.columns[name]
+
+    @staticmethod
+    def operate(column, operator, value):
+
+        if operator == "in":
+            return column.in_(value.split(","))
+        if operator == "ne":
+            return column != value
+        if operator == "gt":
+            return column > value
+        if operator == "gte":
+            return column >= value
+        if operator == "lt":
+            return column < value
+        if operator == "lte":
+            return column <= value
+        if operator == "like":
+            return column.like(value)
+        if operator == "prefix":
+            return column.like(re.sub(r"([\\%_])", r"\\\1", value) + "%", escape="\\")
+
+        return column.is_(None) if value.lower() == "true" else column.isnot(None)
+
+    @classmethod
+    def filter(cls, query, arguments):
+
+        for name, value in arguments.items():
+
+            field, operator = name.rsplit("__", 1) if "__" in name else (name, None)
+
+            if operator is not None:
+
+                if field not in cls.FILTERS or operator not in cls.OPERATORS:
+                    raise ValueError(f"invalid filter '{name}'")
+
+                if operator in ["gt", "gte", "lt", "lte"]:
+                    column, value = cls.ranged(field, value)
+                else:
+                    column = cls.column(field)
+
+                query = query.filter(cls.operate(column, operator, value))
+
+            elif name.startswith("data."):
+                query = query.filter(cls.extract(name[5:]) == value)
+            else:
+                query = query.filter_by(**{name: value})
+
+        return query
+
+    @classmethod
+    def ordering(cls):
+
+        if not flask.has_request_context() or "sort" not in flask.request.args:
+            return cls.ORDER
+
+        ordering = []
+        columns = cls.MODEL.__table__.columns
+
+        for name in flask.request.args["sort"].split(","):
+
+            descending = name.startswith("-")
+            name = name.lstrip("-")
+
+            if name not in cls.FILTERS or name not in columns:
+                raise ValueError(f"invalid sort '{name}'")
+
+            ordering.append(columns[name].desc() if descending else columns[name].asc())
+
+        return ordering
+
+    @classmethod
+    def version(cls, id, fields=None):
+
+        if cls.VERSION is None:
+            return None
+
+        row = flask.request.session.query(
+            getattr(cls.MODEL, cls.VERSION)
+        ).filter_by(
+            id=id
+        ).first()
+
+        if row is None:
+            return None
+
+        return cls.etag(cls.SINGULAR, id, row[0], sorted(fields or []), sorted(cls.schema().names))
+
+    @classmethod
+    def versions(cls, arguments):
+
+        if cls.VERSION is None:
+            return None
+
+        version, count = cls.filter(flask.request.session.query(
+            sqlalchemy.func.max(getattr(cls.MODEL, cls.VERSION)),
+            sqlalchemy.func.count()
+        ).select_from(
+            cls.MODEL
+        ), arguments).one()
+
+        return cls.etag(cls.PLURAL, version, count, flask.request.args.to_dict(), sorted(cls.schema().names))
+
+    @classmethod
+    def retrieve(cls, id, fields=None):
+
+        model = flask.request.session.query(
+            cls.MODEL
+        ).options(
+            *cls.loaders(fields)
+        ).get(
+            id
+        )
+
+        commit()
+        return model
+
+    @staticmethod
+    def sparse():
+
+        if "fields" not in flask.request.args:
+            return None
+
+        return frozenset(field.strip() for field in flask.request.args["fields"].split(",") if field.strip())
+
+    @classmethod
+    def loaders(cls, fields):
+
+        if fields is None:
+            return []
+
+        columns = [column.key for column in cls.MODEL.__table__.columns]
+        loads = {column.key for column in cls.MODEL.__table__.primary_key.columns}
+
+        for field in fields:
+            if field in columns:
+                loads.add(field)
+            elif "data" in columns:
+                loads.add("data")
+
+        return [sqlalchemy.orm.load_only(*sorted(loads))]
+
+    @classmethod
+    def arguments(cls):
+
+        return {
+            name: value for name, value in flask.request.args.to_dict().items()
+            if name not in cls.RESERVED
+        }
+
+    @classmethod
+    def chosen(cls, arguments, previous=None):
+
+        ids = []
+        labels = {}
+
+        primary()
+
+        for id, label in cls.filter(flask.request.session.query(
+            cls.MODEL.id,
+            getattr(cls.MODEL, cls.LABEL)
+        ), arguments).order_by(
+            *cls.ORDER
+        ).all():
+            ids.append(id)
+            labels[id] = label
+
+        commit()
+
+        return {"value": (ids, labels), "store": not replicated()}
+
+    @classmethod
+    def choices(cls):
+
+        listener.listen(flask.current_app.redis, flask.current_app.channel)
+
+        arguments = cls.arguments()
+
+        ids, labels = choices.get(
+            f"{cls.SINGULAR}:{json.dumps(arguments, sort_keys=True)}",
+            functools.partial(cls.chosen, arguments)
+        )
+
+        return (list(ids), dict(labels))
+
+    @classmethod
+    def invalidate(cls):
+
+        choices.drop(f"{cls.SINGULAR}:")
+
+        if cls.CACHE:
+            response_cache.invalidate(cls.SINGULAR)
+
+        notify({"invalidate": cls.SINGULAR})
+
+    @classmethod
+    def changed(cls, action, ids):
+
+        for id in ids:
+            notify({"model": cls.SINGULAR, "action": action, "id": id})
+
+    @staticmethod
+    def invalidated(message):
+
+        if "invalidate" in message:
+            choices.drop(f"{message['invalidate']}:")
+
+    @classmethod
+    def derivation(cls, integrate, previous=None):
+
+        headers = {}
+
+        if previous is not None and previous["etag"]:
+            headers["If-None-Match"] = previous["etag"]
+
+        if "url" in integrate:
+            response = client.options(integrate["url"], headers=headers, timeout=cls.TIMEOUT, retry=False)
+        elif "node" in integrate:
+            response = client.options(
+                f"http://api.klot-io/node", params=integrate["node"], headers=headers, timeout=cls.TIMEOUT, retry=False
+            )
+
+        if previous is not None and response.status_code == 304:
+            value = previous["value"]
+        else:
+            response.raise_for_status()
+            value = response.json()
+
+        return {
+            "value": value,
+            "etag": response.headers.get("ETag"),
+            **cache_control(response.headers)
+        }
 
-class Group(flask_restful.Resource):
-    def get(self):
-        response = requests.get(f"http://api.klot-io/app/{self.APP}/member")
+    @classmethod
+    def derived(cls, integrate):
 
-        response.raise_for_status()
+        entry = derivations.lookup(json.dumps(integrate, sort_keys=True), functools.partial(cls.derivation, integrate))
 
-        return {"group": response.json()}
+        return copy.deepcopy(entry["value"]) if entry is not None else None
 
-class Model:
+    @classmethod
+    def derive(cls, integrate):
 
-    YAML = [
-        {
-            "name": "yaml",
-            "style": "textarea",
-            "optional": True
-        }
-    ]
+        return copy.deepcopy(derivations.get(json.dumps(integrate, sort_keys=True), functools.partial(cls.derivation, integrate)))
 
     @staticmethod
-    def validate(fields):
+    def underived(integrations):
 
-        return validate(fields)
+        underived = []
+
+        for integration in integrations:
+            if "integrate" in integration:
+                underived.append(integration)
+            else:
+                underived.extend(Model.underived(integration.get("fields", [])))
+
+        return underived
 
     @classmethod
-    def retrieve(cls, id):
+    def integrates(cls, integrations):
 
-        model = flask.request.session.query(
-            cls.MODEL
-        ).get(
-            id
-        )
+        deadline = time.monotonic() + cls.DEADLINE
 
-        flask.request.session.commit()
-        return model
+        underived = cls.underived(integrations)
+        futures = {}
 
-    @classmethod
-    def choices(cls):
+        while underived or futures:
 
-        ids = []
-        labels = {}
+            while underived:
 
-        for model in flask.request.session.query(
-            cls.MODEL
-        ).filter_by(
-            **flask.request.args.to_dict()
-        ).order_by(
-            *cls.ORDER
-        ).all():
-            ids.append(model.id)
-            labels[model.id] = model.name
+                integration = underived.pop(0)
+                derived = cls.derived(integration["integrate"])
 
-        flask.request.session.commit()
+                if derived is not None:
+                    integration.update(derived)
+                    underived.extend(cls.underived(integration.get("fields", [])))
+                else:
+                    futures[integrators.submit(cls.derive, integration["integrate"])] = integration
 
-        return (ids, labels)
+            if not futures:
+                break
 
-    @staticmethod
-    def derive(integrate):
+            done, _ = concurrent.futures.wait(
+                futures,
+                timeout=max(deadline - time.monotonic(), 0),
+                return_when=concurrent.futures.FIRST_COMPLETED
+            )
 
-        if "url" in integrate:
-            response = requests.options(integrate["url"])
-        elif "node" in integrate:
-            response = requests.options(f"http://api.klot-io/node", params=integrate["node"])
+            if not done:
+                for future, integration in futures.items():
+                    future.cancel()
+                    integration.setdefault("errors", [])
+                    integration["errors"].append("failed to integrate: timed out")
+                break
 
-        response.raise_for_status()
+            for future in done:
+
+                integration = futures.pop(future)
 
-        return response.json()
+                try:
+                    integration.update(future.result())
+                except Exception as exception:
+                    integration.setdefault("errors", [])
+                    integration["errors"].append(f"failed to integrate: {exception}")
+
+                underived.extend(cls.underived(integration.get("fields", [])))
+
+        return integrations
 
     @classmethod
     def integrate(cls, integration):
 
-        if "integrate" in integration:
-            try:
-                integration.update(cls.derive(integration["integrate"]))
-            except Exception as exception:
-                integration.setdefault("errors", [])
-                integration["errors"].append(f"failed to integrate: {exception}")
+        return cls.integrates([integration])[0]
 
-        for field in integration.get("fields", []):
-            cls.integrate(field)
+    @classmethod
+    def integrations(cls):
 
-        return integration
+        return cls.integrates(integrations.get(cls.SINGULAR))
 
     @classmethod
-    def integrations(cls):
+    def schema(cls):
 
-        integrations = []
+        schema = schemas.get(cls)
 
-        for integration_path in sorted(glob.glob(f"/opt/service/config/integration_*_{cls.SINGULAR}.fields.yaml")):
-            with open(integration_path, "r") as integration_file:
-                integrations.append(cls.integrate({**{"name": integration_path.split("_")[1], **yaml.safe_load(integration_file)}}))
+        if (
+            schema is not None and
+            schema.generation == derivations.generation and
+            time.monotonic() < schema.verified + cls.VERIFY and
+            integrations.entry(cls.SINGULAR) is schema.entry
+        ):
+            return schema
 
-        return integrations
+        generation = derivations.generation
+        integrated = cls.integrations()
+
+        if schema is None or schema.integrations != integrated:
+            schema = Schema(cls.FIELDS + integrated + cls.YAML, integrated)
+
+        schema.entry = integrations.peek(cls.SINGULAR)
+        schema.generation = generation
+        schema.verified = time.monotonic()
+
+        schemas[cls] = schema
+
+        return schema
 
     @classmethod
     def request(cls, converted):
 
         values = {}
 
-        integrations = opengui.Fields({}, {}, cls.integrations())
+        names = cls.schema().names
 
         for field in converted.keys():
 
-            if field in integrations.names:
+            if field in names:
                 values.setdefault("data", {})
                 values["data"][field] = converted[field]
             elif field != "yaml":
@@ -180,7 +1758,7 @@ class Model:
 
         if "yaml" in converted:
             values.setdefault("data", {})
-            values["data"].update(yaml.safe_load(converted["yaml"]))
+            values["data"].update(load_yaml(converted["yaml"]))
 
         if "data" in converted:
             values.setdefault("data", {})
@@ -189,39 +1767,119 @@ class Model:
         return values
 
     @classmethod
-    def response(cls, model):
+    def response(cls, model, schema=None, fields=None, render=True):
 
         converted = {
             "data": {}
         }
 
-        integrations = opengui.Fields({}, {}, cls.integrations())
+        columns = [name for name, column in model.__table__.columns.items() if column.computed is None]
 
-        for field in model.__table__.columns._data.keys():
-            if field != "data":
+        for field in columns:
+            if field != "data" and (fields is None or field in fields):
                 converted[field] = getattr(model, field)
 
+        if fields is not None and fields.issubset(columns) and "data" not in fields:
+            del converted["data"]
+            return converted
+
+        names = (schema or cls.schema()).names
+
         for field in model.data:
-            if field in integrations.names:
+            if field in names:
                 converted[field] = model.data[field]
             else:
                 converted["data"][field] = model.data[field]
 
-        converted["yaml"] = yaml.safe_dump(dict(converted["data"]), default_flow_style=False)
+        if render and (fields is None or "yaml" in fields):
+            converted["yaml"] = dump_yaml(dict(converted["data"]))
+
+        if fields is not None:
+            converted = {field: value for field, value in converted.items() if field in fields}
 
         return converted
 
     @classmethod
-    def responses(cls, models):
+    def rendered(cls, fields=None):
+
+        return cls.LIST_YAML or (fields is not None and "yaml" in fields)
+
+    @classmethod
+    def responses(cls, models, fields=None):
+
+        schema = cls.schema()
+        render = cls.rendered(fields)
+
+        return [cls.response(model, schema, fields, render) for model in models]
+
+listener.handle(Model.invalidated)
+
+class Changes(flask_restful.Resource):
+    """
+    Streams a resource's change events to the browser as Server-Sent Events
+    """
+
+    KEEPALIVE = float(os.environ.get("SSE_KEEPALIVE", 15))
+    BACKLOG = int(os.environ.get("SSE_BACKLOG", 100))
+    RETRY = int(os.environ.get("SSE_RETRY", 3000))
 
-        return [cls.response(model) for model in models]
+    @staticmethod
+    def event(message):
+
+        return f"event: {message['action']}\ndata: {json.dumps(message)}\n\n"
+
+    def get(self):
+
+        listener.listen(flask.current_app.redis, flask.current_app.channel)
+
+        events = queue.Queue(maxsize=self.BACKLOG)
+        singular = self.SINGULAR
+
+        def handler(message):
+
+            if message.get("model") != singular:
+                return
+
+            try:
+                events.put_nowait(message)
+            except queue.Full:
+                with events.mutex:
+                    events.queue.clear()
+                events.put_nowait({"model": singular, "action": "resync", "id": None})
+
+        def stream():
+
+            listener.handle(handler)
+
+            try:
+
+                yield f"retry: {self.RETRY}\n\n"
+
+                while True:
+
+                    try:
+                        message = events.get(timeout=self.KEEPALIVE)
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+                        continue
+
+                    yield self.event(message)
+
+            finally:
+
+                listener.unhandle(handler)
+
+        return flask.Response(stream(), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        })
 
 class RestCL(flask_restful.Resource):
 
     @classmethod
     def fields(cls, values=None, originals=None):
 
-        return opengui.Fields(values, originals=originals, fields=copy.deepcopy(cls.FIELDS + cls.integrations() + cls.YAML))
+        return cls.schema().build(values, originals)
 
     @require_session
     def options(self):
@@ -235,28 +1893,408 @@ class RestCL(flask_restful.Resource):
         else:
             return {"fields": fields.to_list()}
 
+    @staticmethod
+    def batches(rows):
+
+        batches = {}
+
+        for row in rows:
+            batches.setdefault(tuple(sorted(row.keys())), []).append(row)
+
+        return list(batches.values())
+
+    @staticmethod
+    def status(results, success):
+
+        failed = len([result for result in results if result["status"] != success])
+
+        if not failed:
+            return success
+
+        return 400 if failed == len(results) else 207
+
+    def checks(self, items, identified=False):
+
+        results = []
+        rows = []
+
+        for item in items:
+
+            if not isinstance(item, dict):
+                results.append({"status": 400, "errors": ["must be dict"]})
+                continue
+
+            if identified and "id" not in item:
+                results.append({"status": 400, "errors": ["missing id"]})
+                continue
+
+            values = {name: value for name, value in item.items() if name != "id"} if identified else item
+
+            fields = self.fields(values)
+
+            if not self.validate(fields):
+                results.append({"status": 400, "fields": fields.to_list(), "errors": fields.errors})
+                continue
+
+            row = self.request(values)
+
+            if identified:
+                row["_id"] = item["id"]
+
+            rows.append(row)
+            results.append({"status": None})
+
+        return results, rows
+
+    def creates(self):
+
+        results, rows = self.checks(flask.request.json[self.PLURAL])
+
+        if flask.request.args.get("ids", "").lower() == "true":
+
+            models = [self.MODEL(**row) for row in rows]
+
+            flask.request.session.add_all(models)
+            flask.request.session.flush()
+
+            ids = [model.id for model in models]
+
+        else:
+
+            for batch in self.batches(rows):
+                flask.request.session.execute(self.MODEL.__table__.insert(), batch)
+
+            ids = None
+
+        flask.request.session.commit()
+
+        if rows:
+            self.invalidate()
+            self.changed("create", ids or [None])
+
+        created = iter(ids or [])
+
+        for result in results:
+            if result["status"] is None:
+                result["status"] = 201
+                if ids is not None:
+                    result["id"] = next(created)
+
+        return {"created": len(rows), self.PLURAL: results}, self.status(results, 201)
+
     @require_session
     def post(self):
 
+        if self.PLURAL in flask.request.json:
+            return self.creates()
+
         model = self.MODEL(**self.request(flask.request.json[self.SINGULAR]))
         flask.request.session.add(model)
         flask.request.session.commit()
 
+        self.invalidate()
+        self.changed("create", [model.id])
+
         return {self.SINGULAR: self.response(model)}, 201
 
     @require_session
-    def get(self):
+    def patch(self):
+
+        results, rows = self.checks(flask.request.json[self.PLURAL], identified=True)
+
+        existing = set(
+            id for id, in flask.request.session.query(
+                self.MODEL.id
+            ).filter(
+                self.MODEL.id.in_([row["_id"] for row in rows])
+            ).all()
+        ) if rows else set()
 
-        models = flask.request.session.query(
+        checked = iter(rows)
+
+        for result in results:
+            if result["status"] is None:
+                result["status"] = 202 if next(checked)["_id"] in existing else 404
+
+        rows = [row for row in rows if row["_id"] in existing and len(row) > 1]
+
+        table = self.MODEL.__table__
+        updated = 0
+
+        for batch in self.batches(rows):
+            updated += flask.request.session.execute(
+                table.update().where(table.c.id == sqlalchemy.bindparam("_id")),
+                batch
+            ).rowcount
+
+        flask.request.session.commit()
+
+        if rows:
+            self.invalidate()
+            self.changed("update", [row["_id"] for row in rows])
+
+        return {"updated": updated, self.PLURAL: results}, self.status(results, 202)
+
+    @require_session
+    def delete(self):
+
+        ids = [item["id"] if isinstance(item, dict) else item for item in flask.request.json[self.PLURAL]]
+
+        existing = set(
+            id for id, in flask.request.session.query(
+                self.MODEL.id
+            ).filter(
+                self.MODEL.id.in_(ids)
+            ).all()
+        )
+
+        rows = flask.request.session.query(
             self.MODEL
-        ).filter_by(
-            **flask.request.args.to_dict()
+        ).filter(
+            self.MODEL.id.in_(existing)
+        ).delete(
+            synchronize_session=False
+        ) if existing else 0
+
+        flask.request.session.commit()
+
+        if rows:
+            self.invalidate()
+            self.changed("delete", sorted(existing))
+
+        results = [{"status": 202 if id in existing else 404} for id in ids]
+
+        return {"deleted": rows, self.PLURAL: results}, self.status(results, 202)
+
+    @classmethod
+    def keyset(cls):
+
+        keyset = []
+
+        for order in cls.ordering():
+            if isinstance(order, sqlalchemy.sql.elements.UnaryExpression) and order.modifier in [
+                sqlalchemy.sql.operators.asc_op,
+                sqlalchemy.sql.operators.desc_op
+            ]:
+                keyset.append((order.element, order.modifier is sqlalchemy.sql.operators.desc_op))
+            else:
+                keyset.append((order, False))
+
+        keys = [column.key for column, descending in keyset]
+
+        for column in cls.MODEL.__table__.primary_key.columns:
+            if column.key not in keys:
+                keyset.append((column, False))
+
+        return keyset
+
+    @staticmethod
+    def cursor(keyset, model):
+
+        values = [getattr(model, column.key) for column, descending in keyset]
+
+        return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+    @staticmethod
+    def uncursor(keyset, cursor):
+
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except ValueError:
+            values = None
+
+        if not isinstance(values, list) or len(values) != len(keyset):
+            raise ValueError(f"invalid cursor '{cursor}'")
+
+        return values
+
+    @staticmethod
+    def seek(keyset, values):
+
+        clauses = []
+
+        for index, (column, descending) in enumerate(keyset):
+
+            clause = [previous == value for (previous, _), value in zip(keyset[:index], values[:index])]
+            clause.append(column < values[index] if descending else column > values[index])
+
+            clauses.append(sqlalchemy.and_(*clause))
+
+        return sqlalchemy.or_(*clauses)
+
+    def page(self, query):
+
+        keyset = self.keyset()
+
+        try:
+            limit = int(flask.request.args["limit"])
+            if limit < 1:
+                raise ValueError()
+        except ValueError:
+            return {"message": f"invalid limit '{flask.request.args['limit']}'"}, 400
+
+        if "after" in flask.request.args:
+            try:
+                query = query.filter(self.seek(keyset, self.uncursor(keyset, flask.request.args["after"])))
+            except ValueError as exception:
+                return {"message": str(exception)}, 400
+
+        models = query.order_by(
+            *[column.desc() if descending else column for column, descending in keyset]
+        ).limit(
+            limit + 1
+        ).all()
+        commit()
+
+        response = {self.PLURAL: self.responses(models[:limit], self.sparse())}
+        headers = {}
+
+        if len(models) > limit:
+            response["next"] = "?" + urllib.parse.urlencode({
+                **flask.request.args.to_dict(),
+                "after": self.cursor(keyset, models[limit - 1])
+            })
+            headers["Link"] = f'<{response["next"]}>; rel="next"'
+
+        return response, 200, headers
+
+    def stream(self, query):
+
+        models = query.order_by(
+            *self.ordering()
+        ).execution_options(
+            stream_results=True
+        ).yield_per(
+            self.CHUNK
+        )
+
+        schema = self.schema()
+        fields = self.sparse()
+        render = self.rendered(fields)
+
+        def chunks():
+
+            yield f'{{{json.dumps(self.PLURAL)}: ['
+
+            chunk = []
+            separator = ""
+
+            for model in models:
+
+                chunk.append(separator + dumps(self.response(model, schema, fields, render)))
+                separator = ","
+
+                if len(chunk) >= self.CHUNK:
+                    yield "".join(chunk)
+                    chunk = []
+
+            yield "".join(chunk) + "]}"
+
+        return flask.Response(flask.stream_with_context(chunks()), mimetype="application/json")
+
+    def total(self, arguments):
+
+        total = self.filter(flask.request.session.query(
+            sqlalchemy.func.count()
+        ).select_from(
+            self.MODEL
+        ), arguments).scalar()
+        commit()
+
+        return total
+
+    def grouped(self, arguments, name):
+
+        if name not in self.FILTERS:
+            raise ValueError(f"invalid count_by '{name}'")
+
+        column = self.column(name)
+
+        rows = self.filter(flask.request.session.query(
+            column,
+            sqlalchemy.func.count()
+        ).select_from(
+            self.MODEL
+        ), arguments).group_by(
+            column
         ).order_by(
-            *self.ORDER
+            column
         ).all()
-        flask.request.session.commit()
+        commit()
+
+        return [{name: value, "count": count} for value, count in rows]
+
+    @require_session
+    def head(self):
+
+        try:
+            total = self.total(self.arguments())
+        except ValueError:
+            return flask.Response(status=400)
+
+        return flask.Response(status=200, headers={"X-Total-Count": str(total)})
+
+    @require_session
+    def get(self):
+
+        arguments = self.arguments()
+
+        try:
+
+            if flask.request.args.get("count", "").lower() == "true":
+                total = self.total(arguments)
+                return {"count": total}, 200, {"X-Total-Count": str(total)}
+
+            if "count_by" in flask.request.args:
+                return {"counts": self.grouped(arguments, flask.request.args["count_by"])}
+
+        except ValueError as exception:
+            return {"message": str(exception)}, 400
+
+        streaming = "limit" not in flask.request.args and flask.request.args.get("stream", "").lower() == "true"
+
+        key, entry = (None, None) if streaming else self.cached()
 
-        return {self.PLURAL: self.responses(models)}
+        if entry is not None:
+            return self.tagged(entry["tag"], entry["response"], 200, entry["headers"])
+
+        try:
+            query = self.filter(flask.request.session.query(
+                self.MODEL
+            ).options(
+                *self.loaders(self.sparse())
+            ), arguments)
+            ordering = self.ordering()
+        except ValueError as exception:
+            return {"message": str(exception)}, 400
+
+        if streaming:
+            return self.stream(query)
+
+        tag = self.versions(arguments)
+
+        if self.unmodified(tag):
+            return self.tagged(tag, None)
+
+        if "limit" in flask.request.args:
+
+            paged = self.page(query)
+
+            if paged[1] != 200:
+                return paged
+
+            response, status, headers = paged
+
+        else:
+
+            models = query.order_by(
+                *ordering
+            ).all()
+            commit()
+
+            response, status, headers = {self.PLURAL: self.responses(models, self.sparse())}, 200, {}
+
+        return self.cache(key, tag, response, status, headers)
 
 class RestRUD(flask_restful.Resource):
 
@@ -270,7 +2308,7 @@ class RestRUD(flask_restful.Resource):
     @classmethod
     def fields(cls, values=None, originals=None):
 
-        return opengui.Fields(values, originals=originals, fields=copy.deepcopy(cls.ID + cls.FIELDS + cls.integrations() + cls.YAML))
+        return cls.schema().build(values, originals, cls.ID)
 
     @require_session
     def options(self, id):
@@ -289,20 +2327,61 @@ class RestRUD(flask_restful.Resource):
     @require_session
     def get(self, id):
 
-        return {self.SINGULAR: self.response(self.retrieve(id))}
+        key, entry = self.cached(id)
+
+        if entry is not None:
+            return self.tagged(entry["tag"], entry["response"])
+
+        fields = self.sparse()
+        tag = self.version(id, fields)
+
+        if self.unmodified(tag):
+            return self.tagged(tag, None)
+
+        response = {self.SINGULAR: self.response(self.retrieve(id, fields), fields=fields)}
+
+        return self.cache(key, tag, response)
+
+    @staticmethod
+    def merging():
+
+        return (
+            flask.request.args.get("merge", "").lower() == "true" or
+            flask.request.mimetype == "application/merge-patch+json"
+        )
+
+    @classmethod
+    def merged(cls, data):
+
+        return sqlalchemy.func.json_merge_patch(sqlalchemy.func.coalesce(cls.MODEL.data, "{}"), dumps(data))
 
     @require_session
     def patch(self, id):
 
+        if flask.request.mimetype == "application/merge-patch+json":
+            values = self.request(flask.request.json)
+        else:
+            values = self.request(flask.request.json[self.SINGULAR])
+
+        synchronize = "evaluate"
+
+        if self.merging() and "data" in values:
+            values["data"] = self.merged(values["data"])
+            synchronize = False
+
         rows = flask.request.session.query(
             self.MODEL
         ).filter_by(
             id=id
         ).update(
-            self.request(flask.request.json[self.SINGULAR])
+            values,
+            synchronize_session=synchronize
         )
         flask.request.session.commit()
 
+        self.invalidate()
+        self.changed("update", [id] if rows else [])
+
         return {"updated": rows}, 202
 
     @require_session
@@ -315,4 +2394,7 @@ class RestRUD(flask_restful.Resource):
         ).delete()
         flask.request.session.commit()
 
+        self.invalidate()
+        self.changed("delete", [id] if rows else [])
+
         return {"deleted": rows}, 202
@@ -1,5 +1,51 @@
+import queue
 import unittest
 
+class MockPubSub(object):
+
+    def __init__(self, redis, ignore_subscribe_messages=False):
+
+        self.redis = redis
+        self.ignore_subscribe_messages = ignore_subscribe_messages
+        self.channels = []
+        self.queue = queue.Queue()
+
+    def subscribe(self, *channels):
+
+        self.channels.extend(channels)
+        self.redis.pubsubs.append(self)
+
+    def get_message(self, timeout=0):
+
+        try:
+            return self.queue.get(timeout=timeout) if timeout else self.queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def listen(self):
+
+        while True:
+            yield self.queue.get()
+
+class MockPipeline(object):
+
+    def __init__(self, redis, transaction=True):
+
+        self.redis = redis
+        self.transaction = transaction
+        self.commands = []
+
+    def publish(self, channel, message):
+
+        self.commands.append(("publish", channel, message))
+
+    def execute(self):
+
+        results = [getattr(self.redis, command)(*args) for command, *args in self.commands]
+        self.commands = []
+
+        return results
+
 class MockRedis(object):
 
     def __init__(self, host, port):
@@ -9,12 +55,46 @@ class MockRedis(object):
         self.channel = None
 
         self.messages = []
+        self.pubsubs = []
+        self.data = {}
+        self.expires = {}
 
     def publish(self, channel, message):
 
         self.channel = channel
         self.messages.append(message)
 
+        for pubsub in self.pubsubs:
+            if channel in pubsub.channels:
+                pubsub.queue.put({"type": "message", "channel": channel, "data": message})
+
+    def pubsub(self, **kwargs):
+
+        return MockPubSub(self, **kwargs)
+
+    def pipeline(self, **kwargs):
+
+        return MockPipeline(self, **kwargs)
+
+    def get(self, key):
+
+        return self.data.get(key)
+
+    def set(self, key, value):
+
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+
+    def setex(self, key, seconds, value):
+
+        self.set(key, value)
+        self.expires[key] = seconds
+
+    def incr(self, key, amount=1):
+
+        self.set(key, int(self.data.get(key, 0)) + amount)
+
+        return int(self.data[key])
+
 class TestCase(unittest.TestCase):
 
     maxDiff = None
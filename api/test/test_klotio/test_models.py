@@ -1,9 +1,12 @@
+import os
 import unittest
 import unittest.mock
 
 import sqlalchemy
+import sqlalchemy.exc
 import sqlalchemy.ext.mutable
 import sqlalchemy_jsonfield
+import flask
 
 import klotio.models
 
@@ -32,6 +35,21 @@ class UnitTest(klotio.models.MySQL.Base):
         return "<UnitTest(name='%s')>" % (self.name)
 
 
+class Indexed(klotio.models.MySQL.Base):
+
+    __tablename__ = "indexed"
+
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
+    data = sqlalchemy.Column(
+        sqlalchemy.ext.mutable.MutableDict.as_mutable(
+            sqlalchemy_jsonfield.JSONField(enforce_string=True,enforce_unicode=False)
+        ),
+        nullable=False,
+        default=dict
+    )
+    color = klotio.models.MySQL.generated("color")
+
+
 class Sample:
 
     def __init__(self, session):
@@ -73,6 +91,179 @@ class TestMySQL(unittest.TestCase):
 
         self.assertEqual(str(self.session.get_bind().url), "mysql+pymysql://root@klotio-app-mysql:3306/klotio")
 
+    @unittest.mock.patch.dict(os.environ, {
+        "MYSQL_POOL_SIZE": "2",
+        "MYSQL_MAX_OVERFLOW": "1",
+        "MYSQL_POOL_TIMEOUT": "0.5",
+        "MYSQL_POOL_RECYCLE": "60",
+        "MYSQL_POOL_PRE_PING": "false",
+        "MYSQL_POOL_WARM": "5"
+    })
+    def test_pooling(self):
+
+        self.assertEqual(MySQL.pooling(), {
+            "poolclass": klotio.models.Pool,
+            "pool_size": 2,
+            "max_overflow": 1,
+            "pool_timeout": 0.5,
+            "pool_recycle": 60,
+            "pool_pre_ping": False
+        })
+
+        mysql = MySQL()
+
+        self.assertIsInstance(mysql.engine.pool, klotio.models.Pool)
+        self.assertEqual(mysql.engine.pool.size(), 2)
+        self.assertEqual(mysql.engine.pool.checkedin(), 2)
+        self.assertEqual(mysql.engine.pool.checkedout(), 0)
+
+        mysql.engine.dispose()
+
+    def test_warm(self):
+
+        self.mysql.engine.dispose()
+
+        self.mysql.warm(2)
+
+        self.assertEqual(self.mysql.engine.pool.checkedin(), 2)
+        self.assertEqual(self.mysql.engine.pool.checkedout(), 0)
+
+    @unittest.mock.patch.dict(os.environ, {
+        "MYSQL_POOL_SIZE": "1",
+        "MYSQL_MAX_OVERFLOW": "1",
+        "MYSQL_POOL_TIMEOUT": "0.1"
+    })
+    def test_stats(self):
+
+        mysql = MySQL()
+
+        first = mysql.engine.connect()
+        second = mysql.engine.connect()
+
+        self.assertRaises(sqlalchemy.exc.TimeoutError, mysql.engine.connect)
+        self.assertRaises(sqlalchemy.exc.TimeoutError, mysql.session(readonly=True).connection)
+
+        stats = mysql.stats()
+
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["checkedout"], 2)
+        self.assertEqual(stats["overflow"], 1)
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["overflows"], 1)
+        self.assertEqual(stats["timeouts"], 2)
+        self.assertGreaterEqual(stats["waited"], 0.0)
+        self.assertEqual(stats["replicas"], {})
+        self.assertNotIn("reader", stats)
+
+        first.close()
+        second.close()
+
+        self.assertEqual(mysql.stats()["checkedout"], 0)
+
+        mysql.engine.dispose()
+
+    @unittest.mock.patch.dict(os.environ, {
+        "MYSQL_REPLICAS": "klotio-app-mysql-0, klotio-app-mysql-1:3307,",
+        "MYSQL_REPLICA_COOLDOWN": "60"
+    })
+    def test_replica(self):
+
+        mysql = MySQL()
+
+        self.assertEqual([replica["host"] for replica in mysql.replicas], [
+            "klotio-app-mysql-0:3306",
+            "klotio-app-mysql-1:3307"
+        ])
+
+        self.assertEqual(mysql.replica()["host"], "klotio-app-mysql-1:3307")
+        self.assertEqual(mysql.replica()["host"], "klotio-app-mysql-0:3306")
+
+        mysql.select = "least-connections"
+
+        connection = mysql.replicas[0]["engine"].connect()
+        self.assertEqual(mysql.replica()["host"], "klotio-app-mysql-1:3307")
+        connection.close()
+
+        mysql.fail(mysql.replicas[1])
+        self.assertEqual(mysql.replica()["host"], "klotio-app-mysql-0:3306")
+        self.assertFalse(mysql.stats()["replicas"]["klotio-app-mysql-1:3307"]["healthy"])
+
+        session = mysql.session(readonly=True, replica=False)
+        self.assertNotIn("replica", session.info)
+        self.assertTrue(session.info["readonly"])
+        session.close()
+
+        mysql.fail(mysql.replicas[0])
+        self.assertIsNone(mysql.replica())
+
+        for replica in mysql.replicas:
+            replica["engine"].dispose()
+
+        mysql.engine.dispose()
+
+    @unittest.mock.patch.dict(os.environ, {
+        "MYSQL_REPLICAS": "klotio-app-mysql-0"
+    })
+    def test_session(self):
+
+        mysql = MySQL()
+
+        session = mysql.session()
+        self.assertNotIn("replica", session.info)
+        self.assertNotIn("readonly", session.info)
+        self.assertFalse(session.autocommit)
+        session.close()
+
+        session = mysql.session(readonly=True)
+        self.assertEqual(session.info["replica"]["host"], "klotio-app-mysql-0:3306")
+        self.assertTrue(session.autocommit)
+        session.close()
+
+        mysql.fail(mysql.replicas[0])
+
+        session = mysql.session(readonly=True)
+        self.assertNotIn("replica", session.info)
+        self.assertTrue(session.info["readonly"])
+        self.assertIs(session.get_bind(), mysql.engine)
+        self.assertFalse(session.autocommit)
+        session.close()
+
+        mysql.replicas[0]["engine"].dispose()
+        mysql.engine.dispose()
+
+    def test_roundtrip(self):
+
+        app = flask.Flask("klotio-models")
+
+        with app.app_context():
+
+            self.session.execute("SELECT 1")
+            self.session.commit()
+
+            self.assertEqual(flask.g.roundtrips, 3)
+
+            session = self.mysql.session(readonly=True)
+            session.execute("SELECT 1")
+            session.close()
+
+            self.assertEqual(flask.g.roundtrips, 5)
+
+    def test_generated(self):
+
+        column = Indexed.__table__.columns["color"]
+
+        self.assertEqual(column.computed.sqltext.text, """JSON_UNQUOTE(JSON_EXTRACT(`data`, '$."color"'))""")
+        self.assertTrue(column.index)
+        self.assertEqual([index.columns.keys() for index in Indexed.__table__.indexes], [["color"]])
+
+        self.session.add(Indexed(data={"color": "red"}))
+        self.session.add(Indexed(data={"color": "blue"}))
+        self.session.add(Indexed(data={}))
+        self.session.commit()
+
+        self.assertEqual(self.session.query(Indexed.color).order_by(Indexed.id).all(), [("red",), ("blue",), (None,)])
+        self.assertEqual(self.session.query(Indexed).filter_by(color="blue").one().data, {"color": "blue"})
+
     def test_UnitTest(self):
 
         self.session.add(UnitTest(
@@ -6,11 +6,21 @@ import test_klotio.test_models
 import os
 import json
 import yaml
+import time
+import gzip
+import zlib
+import types
+import queue
+import decimal
+import datetime
+import tempfile
+import threading
+import hashlib
 
 import flask
-import flask_restful
 import opengui
 import sqlalchemy.exc
+import sqlalchemy.ext.mutable
 
 import klotio.service
 
@@ -38,6 +48,9 @@ class UnitTestCL(UnitTest, klotio.service.RestCL):
 class UnitTestRUD(UnitTest, klotio.service.RestRUD):
     pass
 
+class UnitTestChanges(UnitTest, klotio.service.Changes):
+    pass
+
 
 class TestRest(klotio.unittest.TestCase):
 
@@ -51,17 +64,32 @@ class TestRest(klotio.unittest.TestCase):
         cls.app.redis = klotio.unittest.MockRedis("redis.com", 567)
         cls.app.channel = "zee"
 
-        api = flask_restful.Api(cls.app)
+        api = klotio.service.Api(cls.app)
 
         api.add_resource(klotio.service.Health, '/health')
+        api.add_resource(klotio.service.Stats, '/stats')
         api.add_resource(Group, '/group')
         api.add_resource(UnitTestCL, '/unittest')
+        api.add_resource(UnitTestChanges, '/unittest/changes')
         api.add_resource(UnitTestRUD, '/unittest/<int:id>')
 
         cls.api = cls.app.test_client()
 
     def setUp(self):
 
+        klotio.service.integrations.clear()
+        klotio.service.derivations.clear()
+        klotio.service.groups.clear()
+        klotio.service.schemas.clear()
+        klotio.service.choices.clear()
+        klotio.service.response_cache.clear()
+
+        if "klotio.publisher" in self.app.extensions:
+            self.app.extensions["klotio.publisher"].flush()
+
+        self.app.redis.data.clear()
+        self.app.redis.messages = []
+
         self.app.mysql.drop_database()
         self.app.mysql.create_database()
 
@@ -75,9 +103,65 @@ class TestRest(klotio.unittest.TestCase):
         self.session.close()
         self.app.mysql.drop_database()
 
+    def changes(self):
+
+        with self.app.app_context():
+            klotio.service.publisher().flush()
+
+        changes = [json.loads(message) for message in self.app.redis.messages]
+
+        return [change for change in changes if "action" in change]
+
 
 class TestAPI(TestRest):
 
+    def test_default(self):
+
+        self.assertEqual(klotio.service.default(datetime.datetime(2020, 1, 2, 3, 4, 5)), "2020-01-02T03:04:05")
+        self.assertEqual(klotio.service.default(datetime.date(2020, 1, 2)), "2020-01-02")
+        self.assertEqual(klotio.service.default(decimal.Decimal("1.10")), "1.10")
+        self.assertEqual(klotio.service.default(types.MappingProxyType({"a": 1})), {"a": 1})
+        self.assertRaisesRegex(TypeError, "Object of type object is not JSON serializable", klotio.service.default, object())
+
+    @unittest.mock.patch("klotio.service.orjson", None)
+    def test_dumps(self):
+
+        data = sqlalchemy.ext.mutable.MutableDict({"a": 1})
+
+        self.assertEqual(
+            klotio.service.dumps({"data": data, "at": datetime.date(2020, 1, 2), "cost": decimal.Decimal("1.10")}),
+            '{"data": {"a": 1}, "at": "2020-01-02", "cost": "1.10"}'
+        )
+
+        with unittest.mock.patch("klotio.service.orjson") as mock_orjson:
+
+            mock_orjson.dumps.return_value = b'{"a":1}'
+
+            self.assertEqual(klotio.service.dumps({"a": 1}), '{"a":1}')
+
+            mock_orjson.dumps.assert_called_once_with(
+                {"a": 1},
+                default=klotio.service.default,
+                option=mock_orjson.OPT_NON_STR_KEYS
+            )
+
+    def test_output_json(self):
+
+        with self.app.test_request_context("/unittest"):
+
+            response = klotio.service.output_json({"a": decimal.Decimal("1")}, 201, {"X-Unit": "test"})
+
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.headers["Content-Type"], "application/json")
+            self.assertEqual(response.headers["X-Unit"], "test")
+            self.assertEqual(json.loads(response.data), {"a": "1"})
+
+    def test_Api(self):
+
+        api = klotio.service.Api(flask.Flask("klotio-api"))
+
+        self.assertIs(api.representations["application/json"], klotio.service.output_json)
+
     def test_require_session(self):
 
         mock_session = unittest.mock.MagicMock()
@@ -85,6 +169,7 @@ class TestAPI(TestRest):
 
         @klotio.service.require_session
         def good():
+            flask.request.session.execute("SELECT 1")
             response = flask.make_response(json.dumps({"message": "yep"}))
             response.headers.set('Content-Type', 'application/json')
             response.status_code = 200
@@ -99,6 +184,7 @@ class TestAPI(TestRest):
 
         @klotio.service.require_session
         def bad():
+            flask.request.session.execute("SELECT 1")
             raise sqlalchemy.exc.InvalidRequestError("nope")
 
         self.app.add_url_rule('/bad', 'bad', bad)
@@ -114,6 +200,7 @@ class TestAPI(TestRest):
 
         @klotio.service.require_session
         def ugly():
+            flask.request.session.execute("SELECT 1")
             raise Exception("whoops")
 
         self.app.add_url_rule('/ugly', 'ugly', ugly)
@@ -128,6 +215,194 @@ class TestAPI(TestRest):
             unittest.mock.call()
         ])
 
+        @klotio.service.require_session
+        def streamed():
+            flask.request.session.execute("SELECT 1")
+            def chunks():
+                mock_session.close.assert_has_calls([
+                    unittest.mock.call(),
+                    unittest.mock.call(),
+                    unittest.mock.call()
+                ])
+                yield '{"message": "streamed"}'
+            return flask.Response(chunks(), mimetype="application/json")
+
+        self.app.add_url_rule('/streamed', 'streamed', streamed)
+
+        response = self.api.get("/streamed")
+        self.assertEqual(response.status_code, 200, response.json)
+        self.assertEqual(response.json["message"], "streamed")
+        response.close()
+        self.assertEqual(mock_session.close.call_count, 4)
+
+        @klotio.service.require_session
+        def untouched():
+            return {"message": "untouched"}
+
+        self.app.add_url_rule('/untouched', 'untouched', untouched)
+
+        response = self.api.get("/untouched")
+        self.assertEqual(response.status_code, 200, response.json)
+        self.assertEqual(response.headers["X-DB-Roundtrips"], "0")
+        self.assertEqual(self.app.mysql.session.call_count, 4)
+        self.assertEqual(mock_session.close.call_count, 4)
+
+    def test_LazySession(self):
+
+        mock_session = unittest.mock.MagicMock()
+        mysql = unittest.mock.MagicMock()
+        mysql.session.return_value = mock_session
+
+        session = klotio.service.LazySession(mysql, readonly=True)
+
+        session.rollback()
+        session.close()
+        mysql.session.assert_not_called()
+
+        session.query("stuff")
+        session.query("things")
+        mysql.session.assert_called_once_with(readonly=True, replica=True)
+        mock_session.query.assert_has_calls([
+            unittest.mock.call("stuff"),
+            unittest.mock.call("things")
+        ])
+
+        session.rollback()
+        session.close()
+        mock_session.rollback.assert_called_once_with()
+        mock_session.close.assert_called_once_with()
+
+    def test_primary(self):
+
+        mysql = unittest.mock.MagicMock()
+
+        with self.app.test_request_context("/unittest"):
+
+            flask.request.session = klotio.service.LazySession(mysql, readonly=True)
+            klotio.service.primary()
+            flask.request.session.query("stuff")
+            mysql.session.assert_called_once_with(readonly=True, replica=False)
+
+            klotio.service.primary()
+            self.assertIs(flask.request.session.opened, mysql.session.return_value)
+
+            flask.request.session = unittest.mock.MagicMock(info={})
+            klotio.service.primary()
+            self.assertFalse(klotio.service.replicated())
+
+            flask.request.session = unittest.mock.MagicMock(info={"replica": {"host": "replica"}})
+            self.assertTrue(klotio.service.replicated())
+
+    def test_commit(self):
+
+        with self.app.test_request_context("/unittest"):
+
+            flask.request.session = unittest.mock.MagicMock(autocommit=True)
+            klotio.service.commit()
+            flask.request.session.commit.assert_not_called()
+
+            flask.request.session = unittest.mock.MagicMock(autocommit=False, info={"readonly": True})
+            klotio.service.commit()
+            flask.request.session.commit.assert_not_called()
+
+            flask.request.session = unittest.mock.MagicMock(autocommit=False, info={})
+            klotio.service.commit()
+            flask.request.session.commit.assert_called_once_with()
+
+    def test_reading(self):
+
+        with self.app.test_request_context("/unittest"):
+            self.assertTrue(klotio.service.reading())
+
+        with self.app.test_request_context("/unittest", method="OPTIONS"):
+            self.assertTrue(klotio.service.reading())
+
+        with self.app.test_request_context("/unittest", method="HEAD"):
+            self.assertTrue(klotio.service.reading())
+
+        with self.app.test_request_context("/unittest", method="POST"):
+            self.assertFalse(klotio.service.reading())
+
+        with self.app.test_request_context("/unittest", headers={"X-Read-Primary": "1"}):
+            self.assertFalse(klotio.service.reading())
+
+        with self.app.test_request_context("/unittest", headers={"Cookie": "klotio-primary=1"}):
+            self.assertFalse(klotio.service.reading())
+
+    def test_require_session_replica(self):
+
+        replica = {"host": "replica"}
+        mock_replica = unittest.mock.MagicMock(info={"replica": replica})
+        mock_primary = unittest.mock.MagicMock(info={})
+
+        def session(readonly=False, replica=True):
+            return mock_replica if readonly and replica else mock_primary
+
+        self.app.mysql.session = unittest.mock.MagicMock(side_effect=session)
+        self.app.mysql.fail = unittest.mock.MagicMock()
+
+        @klotio.service.require_session
+        def lagged():
+            if flask.request.session.info.get("replica") and "slow" in flask.request.args:
+                raise sqlalchemy.exc.OperationalError("SELECT", {}, Exception("timeout"))
+            if flask.request.session.info.get("replica"):
+                raise sqlalchemy.exc.OperationalError("SELECT", {}, Exception("gone"), connection_invalidated=True)
+            if flask.request.method == "DELETE":
+                return {"message": "failed"}, 400
+            return {"message": "primary"}
+
+        self.app.add_url_rule('/lagged', 'lagged', lagged, methods=["GET", "POST", "DELETE"])
+
+        response = self.api.get("/lagged")
+        self.assertEqual(response.status_code, 200, response.json)
+        self.assertEqual(response.json["message"], "primary")
+        self.app.mysql.fail.assert_called_once_with(replica)
+        mock_replica.close.assert_called_once_with()
+        mock_primary.close.assert_called_once_with()
+        self.assertIsNone(response.headers.get("Set-Cookie"))
+
+        response = self.api.get("/lagged?slow=1")
+        self.assertEqual(response.status_code, 500, response.json)
+        self.assertIn("timeout", response.json["message"])
+        self.app.mysql.fail.assert_called_once_with(replica)
+
+        response = self.api.post("/lagged")
+        self.assertEqual(response.status_code, 200, response.json)
+        self.app.mysql.session.assert_called_with(readonly=False, replica=True)
+        self.assertIsNone(response.headers.get("Set-Cookie"))
+
+        with unittest.mock.patch.object(self.app.mysql, "replicas", [replica]):
+
+            response = self.api.post("/lagged")
+            self.assertEqual(response.status_code, 200, response.json)
+            self.assertIn("klotio-primary=1", response.headers["Set-Cookie"])
+            self.assertIn("Max-Age=5", response.headers["Set-Cookie"])
+
+            response = self.api.delete("/lagged")
+            self.assertEqual(response.status_code, 400, response.json)
+            self.assertIsNone(response.headers.get("Set-Cookie"))
+
+    @unittest.mock.patch("yaml.load")
+    def test_load_yaml(self, mock_load):
+
+        mock_load.return_value = {"a": 1}
+
+        self.assertEqual(klotio.service.load_yaml("a: 1"), {"a": 1})
+        self.assertEqual(klotio.service.load_yaml("a: 1"), {"a": 1})
+        self.assertEqual(mock_load.call_count, 2)
+
+        with self.app.test_request_context("/unittest"):
+
+            self.assertEqual(klotio.service.load_yaml("a: 1"), {"a": 1})
+            self.assertEqual(klotio.service.load_yaml("a: 1"), {"a": 1})
+            self.assertEqual(mock_load.call_count, 3)
+
+        mock_load.assert_called_with("a: 1", Loader=klotio.service.Loader)
+
+    def test_dump_yaml(self):
+
+        self.assertEqual(klotio.service.dump_yaml({"b": [1, 2], "a": 1}), "a: 1\nb:\n- 1\n- 2\n")
+
     def test_validate(self):
 
         fields = opengui.Fields(fields=[
@@ -236,239 +511,1807 @@ class TestAPI(TestRest):
         self.app.add_url_rule('/notify', 'notify', notify)
 
         self.assertStatusValue(self.api.get("/notify"), 200, "notify", True)
+
+        with self.app.app_context():
+            klotio.service.publisher().flush()
+
         self.assertEqual(self.app.redis.messages, ['{"a": 1}'])
 
+    def test_publisher(self):
 
-class TestHealth(TestRest):
+        with self.app.app_context():
 
-    def test_get(self):
+            publisher = klotio.service.publisher()
 
-        self.assertEqual(self.api.get("/health").json, {"message": "OK"})
+            self.assertIs(klotio.service.publisher(), publisher)
+            self.assertIs(self.app.extensions["klotio.publisher"], publisher)
+            self.assertEqual(publisher.channel, "zee")
+            self.assertTrue(publisher.daemon)
 
 
-class TestGroup(TestRest):
+class TestCompress(TestRest):
 
-    @unittest.mock.patch("requests.get")
-    def test_get(self, mock_get):
+    def test_Compressor(self):
 
-        mock_get.return_value.json.return_value = [{
-            "name": "unit",
-            "url": "test"
-        }]
+        data = b"unittest" * 100
 
-        self.assertEqual(self.api.get("/group").json, {"group": [{
-            "name": "unit",
-            "url": "test"
-        }]})
+        for encoding, decompress in [
+            ("gzip", gzip.decompress),
+            ("deflate", zlib.decompress)
+        ]:
+            compressor = klotio.service.Compressor(encoding, level=9)
+            self.assertEqual(decompress(compressor.compress(data) + compressor.flush()), data, encoding)
 
-        mock_get.assert_has_calls([
-            unittest.mock.call("http://api.klot-io/app/unittest.klot.io/member"),
-            unittest.mock.call().raise_for_status(),
-            unittest.mock.call().json()
-        ])
+        with unittest.mock.patch("klotio.service.brotli") as mock_brotli:
 
+            compressor = klotio.service.Compressor("br", quality=5)
+            mock_brotli.Compressor.assert_called_once_with(quality=5)
 
-class TestModel(TestRest):
+            compressor.compress(data)
+            compressor.flush()
 
-    def test_validate(self):
+            mock_brotli.Compressor.return_value.process.assert_called_once_with(data)
+            mock_brotli.Compressor.return_value.finish.assert_called_once_with()
 
-        fields = opengui.Fields(fields=[
-            {
-                "name": "name",
-                "value": "yup"
-            },
-            {
-                "name": "yaml",
-                "style": "textarea",
-                "value": "a: 1"
-            }
-        ])
-        self.assertTrue(UnitTest.validate(fields))
-        self.assertFields(fields, [
-            {
-                "name": "name",
-                "value": "yup"
-            },
-            {
-                "name": "yaml",
-                "style": "textarea",
-                "value": "a: 1"
-            }
-        ])
+    def test_encoding(self):
 
-    def test_retrieve(self):
+        with self.app.test_request_context("/unittest"):
+            self.assertIsNone(klotio.service.encoding())
 
-        unit = self.sample.unittest("unit")
+        with self.app.test_request_context("/unittest", headers={"Accept-Encoding": "deflate, gzip;q=0.5"}):
+            self.assertEqual(klotio.service.encoding(), "deflate")
 
-        @klotio.service.require_session
-        def retrieve():
-            response = flask.make_response(json.dumps({"retrieve": UnitTest.retrieve(unit.id).name}))
-            response.headers.set('Content-Type', 'application/json')
-            response.status_code = 200
-            return response
+        with self.app.test_request_context("/unittest", headers={"Accept-Encoding": "br, gzip;q=0.8"}):
 
-        self.app.add_url_rule('/retrieve', 'retrieve', retrieve)
+            with unittest.mock.patch("klotio.service.brotli", None):
+                self.assertEqual(klotio.service.encoding(), "gzip")
 
-        self.assertStatusValue(self.api.get("/retrieve"), 200, "retrieve", "unit")
+            with unittest.mock.patch("klotio.service.brotli", unittest.mock.MagicMock()):
+                self.assertEqual(klotio.service.encoding(), "br")
 
-    def test_choices(self):
+    def test_compress(self):
 
-        unit = self.sample.unittest("unit")
-        test = self.sample.unittest("test")
+        for name in ["a", "b"]:
+            self.sample.unittest(name, {"x": name * 1000})
 
-        @klotio.service.require_session
-        def choices():
-            response = flask.make_response(json.dumps({"choices": UnitTest.choices()}))
-            response.headers.set('Content-Type', 'application/json')
-            response.status_code = 200
-            return response
+        response = self.api.get("/unittest")
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(response.headers["Vary"], "Accept-Encoding")
 
-        self.app.add_url_rule('/choices', 'choices', choices)
+        plain = response.json
+        tag = response.headers["ETag"]
 
-        self.assertStatusValue(self.api.get("/choices"), 200, "choices", [
-            [test.id, unit.id],
-            {str(test.id): "test", str(unit.id): "unit"}
-        ])
+        response = self.api.get("/unittest", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.headers["ETag"], f"W/{tag}")
+        self.assertEqual(json.loads(gzip.decompress(response.data)), plain)
+        self.assertLess(int(response.headers["Content-Length"]), len(json.dumps(plain)))
 
-    @unittest.mock.patch("requests.options")
-    def test_derive(self, mock_options):
+        response = self.api.get("/unittest", headers={"Accept-Encoding": "gzip", "If-None-Match": f"W/{tag}"})
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn("Content-Encoding", response.headers)
 
-        mock_options.return_value.json.return_value = "yep"
+        response = self.api.get("/unittest?fields=id", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("Content-Encoding", response.headers)
 
-        self.assertEqual(UnitTest.derive({"url": "sure"}), "yep")
-        mock_options.assert_has_calls([
-            unittest.mock.call("sure"),
-            unittest.mock.call().raise_for_status(),
-            unittest.mock.call().json()
-        ])
+        response = self.api.get("/unittest?stream=true", headers={"Accept-Encoding": "deflate"})
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.headers["Content-Encoding"], "deflate")
+        self.assertNotIn("Content-Length", response.headers)
+        self.assertEqual(json.loads(zlib.decompress(response.data)), plain)
 
-        self.assertEqual(UnitTest.derive({"node": "sure"}), "yep")
-        mock_options.assert_has_calls([
-            unittest.mock.call("http://api.klot-io/node", params="sure"),
-            unittest.mock.call().raise_for_status(),
-            unittest.mock.call().json()
-        ])
+        self.assertNotIn("Content-Encoding", self.api.head("/unittest", headers={"Accept-Encoding": "gzip"}).headers)
 
-    @unittest.mock.patch("requests.options")
-    def test_integrate(self, mock_options):
+        with unittest.mock.patch("klotio.service.COMPRESS_LEVEL", 0):
+            self.assertNotIn("Content-Encoding", self.api.get("/unittest", headers={"Accept-Encoding": "gzip"}).headers)
 
-        def options(url, params=None):
+    @unittest.mock.patch("klotio.service.listener", klotio.service.Listener())
+    def test_compress_events(self):
 
-            response = unittest.mock.MagicMock()
+        with unittest.mock.patch.object(klotio.service.listener, "listen"):
+            response = self.api.get("/unittest/changes", headers={"Accept-Encoding": "gzip"})
 
-            if url == "sure":
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(next(response.iter_encoded()), b"retry: 3000\n\n")
 
-                response.json.return_value = {
-                    "fields": [
-                        {
-                            "integrate": {
-                                "node": "yep"
-                            }
-                        },
-                        {
-                            "integrate": {
-                                "url": "nope"
-                            }
-                        }
-                    ]
-                }
+        response.close()
 
-            elif url == "http://api.klot-io/node" and params == "yep":
+    def test_conditional(self):
 
-                response.json.return_value = {
-                    "name": "master"
-                }
+        with self.app.test_request_context("/unittest"):
 
-            elif url == "nope":
+            response = klotio.service.conditional(klotio.service.output_json({"a": 1}, 200))
+            self.assertEqual(response.get_etag(), (hashlib.md5(response.get_data()).hexdigest(), False))
 
-                response.raise_for_status.side_effect = Exception("whoops")
+            response = klotio.service.conditional(klotio.service.output_json({"a": 1}, 201))
+            self.assertNotIn("ETag", response.headers)
 
-            return response
+            response = klotio.service.conditional(klotio.service.output_json({"a": 1}, 200, {"ETag": '"abc"'}))
+            self.assertEqual(response.headers["ETag"], '"abc"')
 
-        mock_options.side_effect = options
+            response = klotio.service.conditional(flask.Response("a", mimetype="text/plain"))
+            self.assertNotIn("ETag", response.headers)
 
-        self.assertEqual(UnitTest.integrate({
-            "integrate": {
-                "url": "sure"
-            }
-        }), {
-            "integrate": {
-                "url": "sure"
-            },
-            "fields": [
-                {
-                    "integrate": {
-                        "node": "yep"
-                    },
-                    "name": "master"
-                },
-                {
-                    "integrate": {
-                        "url": "nope"
-                    },
-                    "errors": ["failed to integrate: whoops"]
-                }
-            ]
-        })
+        with self.app.test_request_context("/unittest", method="POST"):
 
-    @unittest.mock.patch("glob.glob")
-    @unittest.mock.patch("klotio.service.open", create=True)
-    @unittest.mock.patch("requests.options")
-    def test_integrations(self, mock_options, mock_open, mock_glob):
+            response = klotio.service.conditional(klotio.service.output_json({"a": 1}, 200))
+            self.assertNotIn("ETag", response.headers)
 
-        mock_glob.return_value = ["/opt/service/config/integration_unit.test_unittest.fields.yaml"]
+            tag = hashlib.md5(response.get_data()).hexdigest()
 
-        mock_open.side_effect = [
-            unittest.mock.mock_open(read_data=yaml.safe_dump({
-                "integrate": {
-                    "url": "sure"
-                }
-            })).return_value
-        ]
+        with self.app.test_request_context("/unittest", headers={"If-None-Match": f'W/"{tag}"'}):
 
-        def options(url, params=None):
+            response = klotio.service.conditional(klotio.service.output_json({"a": 1}, 200))
+            self.assertEqual(response.status_code, 304)
 
-            response = unittest.mock.MagicMock()
+    def test_Api(self):
 
-            if url == "sure":
+        app = flask.Flask("klotio-compress")
 
-                response.json.return_value = {
-                    "fields": [
-                        {
-                            "integrate": {
-                                "node": "yep"
-                            }
-                        },
-                        {
-                            "integrate": {
-                                "url": "nope"
-                            }
-                        }
-                    ]
-                }
+        klotio.service.Api(app)
 
-            elif url == "http://api.klot-io/node" and params == "yep":
+        self.assertEqual(app.after_request_funcs[None], [klotio.service.compress, klotio.service.conditional])
 
-                response.json.return_value = {
-                    "name": "master"
-                }
 
-            elif url == "nope":
+class TestPublisher(klotio.unittest.TestCase):
 
-                response.raise_for_status.side_effect = Exception("whoops")
+    def setUp(self):
 
-            return response
+        self.redis = klotio.unittest.MockRedis("redis.com", 567)
 
-        mock_options.side_effect = options
+        with unittest.mock.patch.object(klotio.service.Publisher, "start"):
+            self.publisher = klotio.service.Publisher(self.redis, "zee", size=10, window=0.01, batch=5)
 
-        self.assertEqual(UnitTest.integrations(), [
-            {
-                "name": "unit.test",
-                "integrate": {
-                    "url": "sure"
-                },
-                "fields": [
-                    {
+    def test_put(self):
+
+        for count in range(10):
+            self.assertTrue(self.publisher.put({"count": count}))
+
+        self.assertFalse(self.publisher.put({"count": 10}))
+        self.assertEqual(self.publisher.stats()["dropped"], 1)
+        self.assertEqual(self.publisher.stats()["queued"], 10)
+
+        self.assertTrue(self.publisher.put({"invalidate": "unittest"}))
+        self.assertTrue(self.publisher.put({"invalidate": "unittest"}))
+        self.assertFalse(self.publisher.put({"model": "unittest", "action": "delete", "id": 1}))
+        self.assertFalse(self.publisher.put({"model": "unittest", "action": "update", "id": 2}))
+
+        self.assertEqual(self.publisher.stats()["dropped"], 3)
+        self.assertEqual(self.publisher.stats()["coalesced"], 2)
+        self.assertEqual(self.publisher.stats()["queued"], 12)
+
+        self.assertEqual([self.publisher.queue.get() for _ in range(12)][10:], [
+            {"invalidate": "unittest"},
+            {"model": "unittest", "action": "resync", "id": None}
+        ])
+
+    def test_release(self):
+
+        for count in range(10):
+            self.publisher.put({"count": count})
+
+        self.publisher.put({"invalidate": "unittest"})
+        self.publisher.put({"model": "unittest", "action": "create", "id": 1})
+
+        self.assertEqual(self.publisher.reserved, {("invalidate", "unittest"), ("resync", "unittest")})
+
+        self.publisher.batch = 12
+        self.publisher.collect()
+
+        self.assertEqual(self.publisher.reserved, set())
+
+        for count in range(10):
+            self.publisher.put({"count": count})
+
+        self.assertTrue(self.publisher.put({"invalidate": "unittest"}))
+        self.assertEqual(self.publisher.stats()["queued"], 11)
+
+    def test_identity(self):
+
+        self.assertEqual(
+            klotio.service.Publisher.identity({"model": "unittest", "action": "update", "id": 1}),
+            ("update", "unittest", 1)
+        )
+        self.assertEqual(klotio.service.Publisher.identity({"invalidate": "unittest"}), ("invalidate", "unittest"))
+        self.assertIsNone(klotio.service.Publisher.identity({"model": "unittest", "action": "delete", "id": 1}))
+        self.assertIsNone(klotio.service.Publisher.identity({"a": 1}))
+
+    def test_collect(self):
+
+        self.publisher.batch = 10
+
+        for message in [
+            {"model": "unittest", "action": "update", "id": 1, "n": 1},
+            {"model": "unittest", "action": "update", "id": 2},
+            {"model": "unittest", "action": "update", "id": 1, "n": 2},
+            {"invalidate": "unittest"},
+            {"model": "unittest", "action": "delete", "id": 1},
+            {"model": "unittest", "action": "update", "id": 1, "n": 3},
+            {"invalidate": "unittest"},
+            {"model": "unittest", "action": "create", "id": None}
+        ]:
+            self.publisher.put(message)
+
+        self.assertEqual(self.publisher.collect(), ([
+            {"model": "unittest", "action": "update", "id": 1, "n": 2},
+            {"model": "unittest", "action": "update", "id": 2},
+            {"invalidate": "unittest"},
+            {"model": "unittest", "action": "delete", "id": 1},
+            {"model": "unittest", "action": "update", "id": 1, "n": 3},
+            {"model": "unittest", "action": "create", "id": None}
+        ], 8))
+
+        self.assertEqual(self.publisher.stats()["coalesced"], 2)
+
+        self.publisher.batch = 5
+
+        for count in range(7):
+            self.publisher.put({"count": count})
+
+        self.assertEqual(len(self.publisher.collect()[0]), 5)
+        self.assertEqual(len(self.publisher.collect()[0]), 2)
+
+    @unittest.mock.patch("time.sleep")
+    def test_publish(self, mock_sleep):
+
+        self.assertTrue(self.publisher.publish([{"a": 1}, {"b": 2}]))
+        self.assertEqual(self.redis.messages, ['{"a": 1}', '{"b": 2}'])
+        self.assertEqual(self.redis.channel, "zee")
+
+        with unittest.mock.patch.object(self.redis, "pipeline", side_effect=Exception("slow")):
+            self.assertFalse(self.publisher.publish([{"c": 3}]))
+
+        mock_sleep.assert_has_calls([
+            unittest.mock.call(0.1),
+            unittest.mock.call(0.2),
+            unittest.mock.call(0.4),
+            unittest.mock.call(0.8)
+        ])
+
+        self.assertEqual(self.publisher.stats(), {
+            "queued": 0,
+            "published": 2,
+            "coalesced": 0,
+            "dropped": 0,
+            "batches": 1,
+            "errors": 4
+        })
+
+    def test_run(self):
+
+        publisher = klotio.service.Publisher(self.redis, "zee", window=0.01)
+
+        publisher.put({"a": 1})
+        publisher.put({"b": 2})
+        publisher.flush()
+
+        self.assertEqual(self.redis.messages, ['{"a": 1}', '{"b": 2}'])
+        self.assertEqual(publisher.stats()["queued"], 0)
+
+
+class TestWatcher(klotio.unittest.TestCase):
+
+    @unittest.mock.patch("klotio.service.inotify_simple")
+    def test___init__(self, mock_inotify):
+
+        mock_inotify.flags.CREATE = 1
+        mock_inotify.flags.DELETE = 2
+        mock_inotify.flags.MODIFY = 4
+        mock_inotify.flags.ATTRIB = 8
+        mock_inotify.flags.CLOSE_WRITE = 16
+        mock_inotify.flags.MOVED_FROM = 32
+        mock_inotify.flags.MOVED_TO = 64
+
+        watcher = klotio.service.Watcher("/opt/service/config")
+
+        self.assertTrue(watcher.daemon)
+        self.assertEqual(watcher.generation, 0)
+        mock_inotify.INotify.return_value.add_watch.assert_called_once_with("/opt/service/config", 127)
+
+
+class TestIntegrations(klotio.unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.integrations = klotio.service.Integrations(self.directory.name)
+
+    def tearDown(self):
+
+        self.directory.cleanup()
+
+    def write(self, name, data):
+
+        path = f"{self.directory.name}/integration_{name}_unittest.fields.yaml"
+
+        with open(path, "w") as integration_file:
+            yaml.safe_dump(data, integration_file)
+
+        return path
+
+    def test_clear(self):
+
+        self.integrations.entries = {"unittest": {}}
+        self.integrations.hits = 1
+        self.integrations.misses = 2
+
+        self.integrations.clear()
+
+        self.assertEqual(self.integrations.entries, {})
+        self.assertEqual(self.integrations.hits, 0)
+        self.assertEqual(self.integrations.misses, 0)
+
+    @unittest.mock.patch("klotio.service.inotify_simple")
+    @unittest.mock.patch("klotio.service.Watcher")
+    def test_watch(self, mock_watcher, mock_inotify):
+
+        self.assertTrue(self.integrations.watch())
+        self.assertTrue(self.integrations.watch())
+
+        mock_watcher.assert_called_once_with(self.directory.name)
+        mock_watcher.return_value.start.assert_called_once_with()
+
+        with unittest.mock.patch("klotio.service.inotify_simple", None):
+            self.assertFalse(klotio.service.Integrations(self.directory.name).watch())
+
+    def test_stamp(self):
+
+        path = self.write("unit.test", {"description": "integrate"})
+        stat = os.stat(path)
+
+        self.assertEqual(klotio.service.Integrations.stamp([path, f"{path}.nope"]), (
+            (path, stat.st_mtime_ns, stat.st_size),
+            (f"{path}.nope", None, None)
+        ))
+
+    def test_parse(self):
+
+        path = self.write("unit.test", {"description": "integrate"})
+
+        self.assertEqual(klotio.service.Integrations.parse([path]), [
+            {
+                "name": "unit.test",
+                "description": "integrate"
+            }
+        ])
+
+    def test_get(self):
+
+        path = self.write("unit.test", {"description": "integrate"})
+
+        integrations = self.integrations.get("unittest")
+        self.assertEqual(integrations, [
+            {
+                "name": "unit.test",
+                "description": "integrate"
+            }
+        ])
+        self.assertEqual(self.integrations.stats(), {"hits": 0, "misses": 1, "models": 1, "watching": False})
+
+        integrations[0]["description"] = "changed"
+
+        self.assertEqual(self.integrations.get("unittest"), [
+            {
+                "name": "unit.test",
+                "description": "integrate"
+            }
+        ])
+        self.assertEqual(self.integrations.stats(), {"hits": 1, "misses": 1, "models": 1, "watching": False})
+
+        self.write("unit.test", {"description": "modified"})
+        os.utime(path, ns=(0, 0))
+
+        self.assertEqual(self.integrations.get("unittest"), [
+            {
+                "name": "unit.test",
+                "description": "modified"
+            }
+        ])
+        self.assertEqual(self.integrations.stats(), {"hits": 1, "misses": 2, "models": 1, "watching": False})
+
+        self.write("unit.more", {"description": "added"})
+
+        self.assertEqual(self.integrations.get("unittest"), [
+            {
+                "name": "unit.more",
+                "description": "added"
+            },
+            {
+                "name": "unit.test",
+                "description": "modified"
+            }
+        ])
+        self.assertEqual(self.integrations.stats(), {"hits": 1, "misses": 3, "models": 1, "watching": False})
+
+        os.remove(path)
+
+        self.assertEqual(self.integrations.get("unittest"), [
+            {
+                "name": "unit.more",
+                "description": "added"
+            }
+        ])
+        self.assertEqual(self.integrations.stats(), {"hits": 1, "misses": 4, "models": 1, "watching": False})
+
+    def test_entry(self):
+
+        self.write("unit.test", {"description": "integrate"})
+
+        entry = self.integrations.entry("unittest")
+        self.assertEqual(entry["integrations"], [
+            {
+                "name": "unit.test",
+                "description": "integrate"
+            }
+        ])
+        self.assertIs(self.integrations.entry("unittest"), entry)
+
+        self.write("unit.more", {"description": "added"})
+        self.assertIsNot(self.integrations.entry("unittest"), entry)
+
+    def test_peek(self):
+
+        self.assertIsNone(self.integrations.peek("unittest"))
+
+        entry = self.integrations.entry("unittest")
+        self.assertIs(self.integrations.peek("unittest"), entry)
+
+    @unittest.mock.patch("glob.glob")
+    def test_get_watching(self, mock_glob):
+
+        mock_glob.return_value = [self.write("unit.test", {"description": "integrate"})]
+
+        self.integrations.watcher = unittest.mock.MagicMock(generation=1)
+
+        self.integrations.get("unittest")
+        self.integrations.get("unittest")
+        mock_glob.assert_called_once_with(f"{self.directory.name}/integration_*_unittest.fields.yaml")
+
+        self.integrations.watcher.generation = 2
+
+        self.integrations.get("unittest")
+        self.assertEqual(mock_glob.call_count, 2)
+        self.assertEqual(self.integrations.stats(), {"hits": 2, "misses": 1, "models": 1, "watching": True})
+
+
+class TestClient(klotio.unittest.TestCase):
+
+    def setUp(self):
+
+        self.client = klotio.service.Client(size=3, timeout=2, retries=1, backoff=0.5)
+
+    def test___init__(self):
+
+        self.assertEqual(self.client.adapter._pool_connections, 3)
+        self.assertEqual(self.client.adapter._pool_maxsize, 3)
+        self.assertEqual(self.client.adapter.max_retries.total, 1)
+        self.assertEqual(self.client.adapter.max_retries.backoff_factor, 0.5)
+        self.assertIs(self.client.session.get_adapter("http://api.klot-io"), self.client.adapter)
+        self.assertIs(self.client.session.get_adapter("https://api.klot-io"), self.client.adapter)
+        self.assertEqual(self.client.single.max_retries.total, 0)
+        self.assertIs(self.client.once.get_adapter("http://api.klot-io"), self.client.single)
+
+    @unittest.mock.patch("requests.Session.request")
+    def test_request(self, mock_request):
+
+        self.assertEqual(self.client.request("GET", "http://api.klot-io/app"), mock_request.return_value)
+        mock_request.assert_called_once_with("GET", "http://api.klot-io/app", timeout=2)
+
+        mock_request.side_effect = Exception("whoops")
+        self.assertRaisesRegex(Exception, "whoops", self.client.request, "GET", "http://api.klot-io/app", timeout=1)
+        mock_request.assert_called_with("GET", "http://api.klot-io/app", timeout=1)
+
+        with unittest.mock.patch.object(self.client.once, "request") as mock_once:
+            self.assertEqual(self.client.request("GET", "http://api.klot-io/app", retry=False), mock_once.return_value)
+            mock_once.assert_called_once_with("GET", "http://api.klot-io/app", timeout=2)
+
+        self.assertEqual(self.client.hosts["api.klot-io"]["requests"], 3)
+        self.assertEqual(self.client.hosts["api.klot-io"]["errors"], 1)
+
+    @unittest.mock.patch("klotio.service.Client.request")
+    def test_get(self, mock_request):
+
+        self.assertEqual(self.client.get("http://api.klot-io", params="yep"), mock_request.return_value)
+        mock_request.assert_called_once_with("GET", "http://api.klot-io", params="yep")
+
+    @unittest.mock.patch("klotio.service.Client.request")
+    def test_options(self, mock_request):
+
+        self.assertEqual(self.client.options("http://api.klot-io", params="yep"), mock_request.return_value)
+        mock_request.assert_called_once_with("OPTIONS", "http://api.klot-io", params="yep")
+
+    def test_stats(self):
+
+        self.client.hosts["api.klot-io"] = {"requests": 4, "errors": 1, "seconds": 2.0}
+        self.client.hosts["nope"] = {"requests": 0, "errors": 0, "seconds": 0.0}
+
+        pool = self.client.adapter.poolmanager.connection_from_url("http://api.klot-io")
+        pool.num_connections = 1
+        pool.num_requests = 4
+
+        self.assertEqual(self.client.stats(), {
+            "api.klot-io": {
+                "requests": 4,
+                "errors": 1,
+                "latency": 0.5,
+                "connections": 1,
+                "reused": 3
+            },
+            "nope": {
+                "requests": 0,
+                "errors": 0,
+                "latency": 0.0,
+                "connections": 0,
+                "reused": 0
+            }
+        })
+
+
+class TestCache(klotio.unittest.TestCase):
+
+    def setUp(self):
+
+        self.cache = klotio.service.Cache(ttl=10, stale=20, interval=5)
+
+    def test_cache_control(self):
+
+        self.assertEqual(klotio.service.cache_control({}), {})
+        self.assertEqual(klotio.service.cache_control({"Cache-Control": "no-store"}), {"store": False})
+        self.assertEqual(klotio.service.cache_control({"Cache-Control": "no-cache"}), {"ttl": 0})
+        self.assertEqual(klotio.service.cache_control({
+            "Cache-Control": "public, Max-Age=5, stale-while-revalidate=7"
+        }), {"ttl": 5, "stale": 7})
+        self.assertEqual(klotio.service.cache_control({
+            "Cache-Control": 'max-age="5", stale-while-revalidate=soon'
+        }), {"ttl": 5})
+        self.assertEqual(klotio.service.cache_control({
+            "Cache-Control": "max-age=-1, max-age=, stale-while-revalidate=1.5"
+        }), {})
+
+    def test_clear(self):
+
+        self.cache.entries = {"a": {}}
+        self.cache.refreshing = {"a"}
+        self.cache.flights = {"a": {}}
+        self.cache.kept = {"a": None}
+        self.cache.generation = 4
+        self.cache.hits = 1
+        self.cache.stales = 2
+        self.cache.misses = 3
+
+        self.cache.clear()
+
+        self.assertEqual(self.cache.entries, {})
+        self.assertEqual(self.cache.refreshing, set())
+        self.assertEqual(self.cache.flights, {})
+        self.assertEqual(self.cache.kept, {})
+        self.assertEqual(self.cache.generation, 0)
+        self.assertEqual(self.cache.stats(), {"hits": 0, "stales": 0, "misses": 0, "entries": 0})
+
+    @unittest.mock.patch("time.monotonic")
+    def test_refresh(self, mock_monotonic):
+
+        mock_monotonic.return_value = 100
+
+        self.cache.refreshing.add("a")
+
+        self.assertEqual(self.cache.refresh("a", lambda previous: {"value": 1}), {
+            "value": 1,
+            "etag": None,
+            "fetched": 100,
+            "expires": 110,
+            "stale": 130
+        })
+        self.assertEqual(self.cache.refreshing, set())
+        self.assertIn("a", self.cache.entries)
+
+        self.assertEqual(self.cache.refresh("b", lambda previous: {"value": 2, "etag": "x", "ttl": 1, "stale": 2}), {
+            "value": 2,
+            "etag": "x",
+            "fetched": 100,
+            "expires": 101,
+            "stale": 103
+        })
+
+        self.cache.refresh("c", lambda previous: {"value": 3, "store": False})
+        self.assertNotIn("c", self.cache.entries)
+        self.assertEqual(self.cache.generation, 2)
+
+        self.cache.refresh("a", lambda previous: {"value": 1})
+        self.assertEqual(self.cache.generation, 2)
+
+        self.cache.refresh("a", lambda previous: {"value": 4})
+        self.assertEqual(self.cache.generation, 3)
+
+    @unittest.mock.patch("threading.Thread")
+    @unittest.mock.patch("time.monotonic")
+    def test_lookup(self, mock_monotonic, mock_thread):
+
+        fetch = unittest.mock.MagicMock(return_value={"value": 2})
+
+        self.assertIsNone(self.cache.lookup("a", fetch))
+
+        entry = {"value": 1, "expires": 110, "stale": 130}
+        self.cache.entries["a"] = entry
+
+        mock_monotonic.return_value = 105
+        self.assertEqual(self.cache.lookup("a", fetch), entry)
+        mock_thread.assert_not_called()
+
+        mock_monotonic.return_value = 120
+        self.assertEqual(self.cache.lookup("a", fetch), entry)
+        self.assertEqual(self.cache.lookup("a", fetch), entry)
+
+        mock_thread.assert_called_once_with(target=self.cache.background, args=("a", fetch, entry), daemon=True)
+        mock_thread.return_value.start.assert_called_once_with()
+
+        self.cache.background("a", fetch, entry)
+        fetch.assert_called_once_with(entry)
+        self.assertEqual(self.cache.entries["a"]["value"], 2)
+        self.assertEqual(self.cache.refreshing, set())
+
+        fetch.side_effect = Exception("whoops")
+        self.cache.background("a", fetch, entry)
+
+        mock_monotonic.return_value = 1000
+        self.assertIsNone(self.cache.lookup("a", fetch))
+
+        self.assertEqual(self.cache.stats(), {"hits": 1, "stales": 2, "misses": 0, "entries": 1})
+
+    def test_entry(self):
+
+        released = threading.Event()
+        fetches = []
+
+        def fetch(previous):
+            fetches.append(previous)
+            released.wait(5)
+            return {"value": len(fetches)}
+
+        entries = []
+        threads = [threading.Thread(target=lambda: entries.append(self.cache.entry("a", fetch))) for _ in range(3)]
+
+        for thread in threads:
+            thread.start()
+
+        while len(self.cache.flights) == 0 or self.cache.misses < 3:
+            time.sleep(0.01)
+
+        released.set()
+
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(fetches, [None])
+        self.assertEqual([entry["value"] for entry in entries], [1, 1, 1])
+        self.assertEqual(self.cache.flights, {})
+
+        self.cache.entries["a"]["stale"] = 0
+
+        self.assertRaisesRegex(Exception, "whoops", self.cache.entry, "a", unittest.mock.MagicMock(side_effect=Exception("whoops")))
+
+        self.cache.fallback = True
+        self.assertEqual(self.cache.entry("a", unittest.mock.MagicMock(side_effect=Exception("whoops")))["value"], 1)
+
+    @unittest.mock.patch("threading.Thread")
+    @unittest.mock.patch("time.monotonic")
+    def test_entry_fallback(self, mock_monotonic, mock_thread):
+
+        self.cache.fallback = True
+
+        entry = {"value": 1, "expires": 110, "stale": 130}
+        self.cache.entries["a"] = entry
+
+        fetch = unittest.mock.MagicMock(side_effect=Exception("whoops"))
+
+        mock_monotonic.return_value = 1000
+
+        self.assertEqual(self.cache.entry("a", fetch), entry)
+        self.assertEqual(self.cache.entry("a", fetch), entry)
+
+        fetch.assert_not_called()
+        mock_thread.assert_called_once_with(target=self.cache.background, args=("a", fetch, entry), daemon=True)
+        self.assertEqual(self.cache.stats(), {"hits": 0, "stales": 2, "misses": 0, "entries": 1})
+
+    def test_get(self):
+
+        fetch = unittest.mock.MagicMock(return_value={"value": 1})
+
+        self.assertEqual(self.cache.get("a", fetch), 1)
+        self.assertEqual(self.cache.get("a", fetch), 1)
+
+        fetch.assert_called_once_with(None)
+        self.assertEqual(self.cache.stats(), {"hits": 1, "stales": 0, "misses": 1, "entries": 1})
+
+    def test_drop(self):
+
+        self.cache.entries = {"a:1": {}, "a:2": {}, "ab:1": {}}
+
+        self.cache.drop("a:")
+
+        self.assertEqual(self.cache.entries, {"ab:1": {}})
+
+    @unittest.mock.patch("threading.Thread")
+    def test_keep(self, mock_thread):
+
+        fetch = unittest.mock.MagicMock()
+
+        self.cache.keep("a", fetch)
+        self.cache.keep("b", fetch)
+
+        self.assertEqual(self.cache.kept, {"a": fetch, "b": fetch})
+        mock_thread.assert_called_once_with(target=self.cache.warming, daemon=True)
+        mock_thread.return_value.start.assert_called_once_with()
+
+    def test_warm(self):
+
+        self.cache.kept["a"] = unittest.mock.MagicMock(return_value={"value": 1})
+        self.cache.kept["b"] = unittest.mock.MagicMock(side_effect=Exception("whoops"))
+
+        self.cache.warm()
+        self.assertEqual(self.cache.entries["a"]["value"], 1)
+        self.assertNotIn("b", self.cache.entries)
+
+        self.cache.kept["a"].return_value = {"value": 2}
+
+        self.cache.warm()
+        self.assertEqual(self.cache.entries["a"]["value"], 2)
+        self.cache.kept["a"].assert_called_with(unittest.mock.ANY)
+
+
+class TestSchema(klotio.unittest.TestCase):
+
+    def setUp(self):
+
+        self.fields = [
+            {
+                "name": "name"
+            },
+            {
+                "name": "unit.test",
+                "content": {"description": "integrate"},
+                "fields": [
+                    {
+                        "name": "integrate",
+                        "errors": ["failed to integrate: whoops"]
+                    }
+                ]
+            }
+        ]
+
+        self.schema = klotio.service.Schema(self.fields, [self.fields[1]])
+
+    def test___init__(self):
+
+        self.assertIsNone(self.schema.entry)
+        self.assertIsNone(self.schema.generation)
+        self.assertEqual(self.schema.verified, 0)
+        self.assertEqual(self.schema.fields, tuple(self.fields))
+        self.assertIsNot(self.schema.fields[0], self.fields[0])
+        self.assertEqual(self.schema.lookup["unit.test"], self.fields[1])
+        self.assertEqual(self.schema.names, frozenset(["unit.test"]))
+
+    def test_thaw(self):
+
+        thawed = klotio.service.Schema.thaw(self.schema.fields[1])
+
+        self.assertEqual(thawed, self.fields[1])
+
+        thawed["content"]["description"] = "changed"
+        thawed["fields"][0]["errors"].append("more")
+
+        self.assertEqual(self.schema.fields[1], self.fields[1])
+
+    def test_build(self):
+
+        fields = self.schema.build({"name": "yup"}, {"name": "nope"}, [{"name": "id", "readonly": True}])
+
+        self.assertFields(fields, [
+            {
+                "name": "id",
+                "readonly": True
+            },
+            {
+                "name": "name",
+                "value": "yup",
+                "original": "nope"
+            },
+            {
+                "name": "unit.test",
+                "description": "integrate",
+                "fields": [
+                    {
+                        "name": "integrate",
+                        "errors": ["failed to integrate: whoops"]
+                    }
+                ]
+            }
+        ])
+
+        fields["unit.test"].content["description"] = "changed"
+        fields["unit.test"].fields["integrate"].errors.append("more")
+
+        self.assertEqual(self.schema.fields[1], self.fields[1])
+
+
+class TestListener(klotio.unittest.TestCase):
+
+    def setUp(self):
+
+        self.listener = klotio.service.Listener()
+
+    def test_handle(self):
+
+        handler = unittest.mock.MagicMock()
+
+        self.listener.handle(handler)
+
+        self.assertEqual(self.listener.handlers, [handler])
+
+        self.listener.unhandle(handler)
+        self.listener.unhandle(handler)
+
+        self.assertEqual(self.listener.handlers, [])
+
+    @unittest.mock.patch("threading.Thread")
+    def test_listen(self, mock_thread):
+
+        redis = klotio.unittest.MockRedis("redis.com", 567)
+
+        self.listener.listen(redis, "zee")
+        self.listener.listen(redis, "zee")
+
+        self.assertEqual(self.listener.pubsub.channels, ["zee"])
+        self.assertTrue(self.listener.pubsub.ignore_subscribe_messages)
+        mock_thread.assert_called_once_with(target=self.listener.run, daemon=True)
+        mock_thread.return_value.start.assert_called_once_with()
+
+    def test_dispatch(self):
+
+        handled = []
+
+        self.listener.handle(handled.append)
+        self.listener.handle(unittest.mock.MagicMock(side_effect=Exception("whoops")))
+        self.listener.handle(handled.append)
+
+        self.listener.dispatch({"type": "subscribe", "data": 1})
+        self.listener.dispatch({"type": "message", "data": "nope"})
+        self.listener.dispatch({"type": "message", "data": '{"a": 1}'})
+
+        self.assertEqual(handled, [{"a": 1}, {"a": 1}])
+
+    def test_run(self):
+
+        redis = klotio.unittest.MockRedis("redis.com", 567)
+        handled = queue.Queue()
+
+        self.listener.handle(handled.put)
+        self.listener.listen(redis, "zee")
+
+        redis.publish("zee", '{"a": 1}')
+
+        self.assertEqual(handled.get(timeout=5), {"a": 1})
+
+
+class TestHealth(TestRest):
+
+    def test_get(self):
+
+        self.assertEqual(self.api.get("/health").json, {"message": "OK"})
+
+
+class TestChanges(TestRest):
+
+    def test_event(self):
+
+        self.assertEqual(
+            klotio.service.Changes.event({"model": "unittest", "action": "update", "id": 1}),
+            'event: update\ndata: {"model": "unittest", "action": "update", "id": 1}\n\n'
+        )
+
+    @unittest.mock.patch("klotio.service.listener", klotio.service.Listener())
+    @unittest.mock.patch.object(UnitTestChanges, "BACKLOG", 2)
+    @unittest.mock.patch.object(UnitTestChanges, "KEEPALIVE", 0.01)
+    def test_get(self):
+
+        def dispatch(message):
+            klotio.service.listener.dispatch({"type": "message", "data": json.dumps(message)})
+
+        with unittest.mock.patch.object(klotio.service.listener, "listen") as mock_listen:
+            response = self.api.get("/unittest/changes")
+
+        mock_listen.assert_called_once_with(self.app.redis, "zee")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.headers["Content-Type"], "text/event-stream; charset=utf-8")
+        self.assertEqual(response.headers["Cache-Control"], "no-cache")
+
+        chunks = response.iter_encoded()
+
+        self.assertEqual(next(chunks), b"retry: 3000\n\n")
+        self.assertEqual(len(klotio.service.listener.handlers), 1)
+
+        dispatch({"model": "other", "action": "update", "id": 1})
+        dispatch({"model": "unittest", "action": "update", "id": 2})
+
+        self.assertEqual(next(chunks), b'event: update\ndata: {"model": "unittest", "action": "update", "id": 2}\n\n')
+        self.assertEqual(next(chunks), b": keepalive\n\n")
+
+        for id in range(3):
+            dispatch({"model": "unittest", "action": "delete", "id": id})
+
+        self.assertEqual(next(chunks), b'event: resync\ndata: {"model": "unittest", "action": "resync", "id": null}\n\n')
+        self.assertEqual(next(chunks), b": keepalive\n\n")
+
+        response.close()
+
+        self.assertEqual(klotio.service.listener.handlers, [])
+
+        with unittest.mock.patch.object(klotio.service.listener, "listen"):
+            self.api.head("/unittest/changes").close()
+
+        self.assertEqual(klotio.service.listener.handlers, [])
+
+
+class TestResponseCache(TestRest):
+
+    def test_key(self):
+
+        with self.app.test_request_context("/unittest?b=2&a=1&a=0"):
+
+            self.assertEqual(klotio.service.response_cache.key("unittest"), "zee/unittest/0/?a=0&a=1&b=2")
+            self.assertEqual(klotio.service.response_cache.key("unittest", 3), "zee/unittest/0/3?a=0&a=1&b=2")
+
+            klotio.service.response_cache.invalidate("unittest")
+
+            self.assertEqual(klotio.service.response_cache.key("unittest"), "zee/unittest/1/?a=0&a=1&b=2")
+
+            with unittest.mock.patch.object(self.app.redis, "get", side_effect=Exception("down")):
+                self.assertIsNone(klotio.service.response_cache.key("unittest"))
+
+        self.assertEqual(klotio.service.response_cache.stats()["errors"], 1)
+
+    def test_get(self):
+
+        with self.app.test_request_context("/unittest"):
+
+            self.assertIsNone(klotio.service.response_cache.get(None))
+            self.assertIsNone(klotio.service.response_cache.get("zee/unittest/0/?"))
+
+            klotio.service.response_cache.set(None, 30, {"a": 1})
+            klotio.service.response_cache.set("zee/unittest/0/?", 30, {"a": 1})
+
+            self.assertEqual(self.app.redis.expires["zee/unittest/0/?"], 30)
+            self.assertEqual(klotio.service.response_cache.get("zee/unittest/0/?"), {"a": 1})
+
+            with unittest.mock.patch.object(self.app.redis, "setex", side_effect=Exception("down")):
+                klotio.service.response_cache.set("zee/unittest/0/?", 30, {"a": 1})
+
+        self.assertEqual(klotio.service.response_cache.stats(), {
+            "hits": 1,
+            "misses": 1,
+            "errors": 1,
+            "ratio": 0.5
+        })
+
+    def test_invalidate(self):
+
+        with self.app.test_request_context("/unittest"):
+
+            klotio.service.response_cache.invalidate("unittest")
+            self.assertEqual(self.app.redis.data["zee/unittest"], b"1")
+
+            with unittest.mock.patch.object(self.app.redis, "incr", side_effect=Exception("down")):
+                klotio.service.response_cache.invalidate("unittest")
+
+        self.assertEqual(self.app.redis.data["zee/unittest"], b"1")
+        self.assertEqual(klotio.service.response_cache.stats()["errors"], 1)
+
+    @unittest.mock.patch.object(UnitTest, "CACHE", 30)
+    def test_invalidate_write(self):
+
+        unit = self.sample.unittest("unit")
+
+        with unittest.mock.patch.object(self.app.redis, "incr", side_effect=Exception("down")):
+            self.assertStatusValue(self.api.patch(f"/unittest/{unit.id}", json={
+                "unittest": {"name": "unity"}
+            }), 202, "updated", 1)
+
+        self.assertEqual(klotio.service.response_cache.stats()["errors"], 1)
+
+
+class TestStats(TestRest):
+
+    def test_get(self):
+
+        stats = self.api.get("/stats").json
+
+        self.assertEqual(stats["integrations"], {
+            "hits": 0,
+            "misses": 0,
+            "models": 0,
+            "watching": False
+        })
+
+        self.assertEqual(stats["responses"], {
+            "hits": 0,
+            "misses": 0,
+            "errors": 0,
+            "ratio": 0.0
+        })
+
+        for cache in ["derivations", "groups", "choices"]:
+            self.assertEqual(stats[cache], {
+                "hits": 0,
+                "stales": 0,
+                "misses": 0,
+                "entries": 0
+            }, cache)
+
+        self.assertEqual(stats["http"], klotio.service.client.stats())
+        self.assertEqual(stats["mysql"], self.app.mysql.stats())
+
+
+class TestGroup(TestRest):
+
+    @unittest.mock.patch("klotio.service.client.get")
+    def test_member(self, mock_get):
+
+        mock_get.return_value.json.return_value = [{
+            "name": "unit",
+            "url": "test"
+        }]
+
+        self.assertEqual(Group.member(), {"value": [{
+            "name": "unit",
+            "url": "test"
+        }]})
+
+        mock_get.assert_has_calls([
+            unittest.mock.call("http://api.klot-io/app/unittest.klot.io/member"),
+            unittest.mock.call().raise_for_status(),
+            unittest.mock.call().json()
+        ])
+
+    @unittest.mock.patch("klotio.service.groups.keep")
+    @unittest.mock.patch("klotio.service.client.get")
+    def test_get(self, mock_get, mock_keep):
+
+        mock_get.return_value.json.return_value = [{
+            "name": "unit",
+            "url": "test"
+        }]
+
+        response = self.api.get("/group")
+        self.assertEqual(response.json, {"group": [{
+            "name": "unit",
+            "url": "test"
+        }]})
+        self.assertEqual(response.headers["Age"], "0")
+        mock_keep.assert_called_once_with("unittest.klot.io", Group.member)
+
+        self.api.get("/group")
+        mock_get.assert_called_once_with("http://api.klot-io/app/unittest.klot.io/member")
+
+        klotio.service.groups.entries["unittest.klot.io"]["fetched"] -= 1000
+        klotio.service.groups.entries["unittest.klot.io"]["expires"] -= 1000
+        klotio.service.groups.entries["unittest.klot.io"]["stale"] -= 1000
+        mock_get.return_value.raise_for_status.side_effect = Exception("whoops")
+
+        response = self.api.get("/group")
+        self.assertEqual(response.json, {"group": [{
+            "name": "unit",
+            "url": "test"
+        }]})
+        self.assertEqual(response.headers["Age"], "1000")
+
+
+class TestModel(TestRest):
+
+    def test_validate(self):
+
+        fields = opengui.Fields(fields=[
+            {
+                "name": "name",
+                "value": "yup"
+            },
+            {
+                "name": "yaml",
+                "style": "textarea",
+                "value": "a: 1"
+            }
+        ])
+        self.assertTrue(UnitTest.validate(fields))
+        self.assertFields(fields, [
+            {
+                "name": "name",
+                "value": "yup"
+            },
+            {
+                "name": "yaml",
+                "style": "textarea",
+                "value": "a: 1"
+            }
+        ])
+
+    def test_retrieve(self):
+
+        unit = self.sample.unittest("unit")
+
+        @klotio.service.require_session
+        def retrieve():
+            response = flask.make_response(json.dumps({"retrieve": UnitTest.retrieve(unit.id).name}))
+            response.headers.set('Content-Type', 'application/json')
+            response.status_code = 200
+            return response
+
+        self.app.add_url_rule('/retrieve', 'retrieve', retrieve)
+
+        self.assertStatusValue(self.api.get("/retrieve"), 200, "retrieve", "unit")
+
+    def test_sparse(self):
+
+        with self.app.test_request_context("/unittest"):
+            self.assertIsNone(UnitTest.sparse())
+
+        with self.app.test_request_context("/unittest?fields=id, name,,yaml"):
+            self.assertEqual(UnitTest.sparse(), frozenset(["id", "name", "yaml"]))
+
+    def test_loaders(self):
+
+        self.assertEqual(UnitTest.loaders(None), [])
+
+        unit = self.sample.unittest("unit", {"a": 1})
+        self.session.expunge_all()
+
+        model = self.session.query(test_klotio.test_models.UnitTest).options(*UnitTest.loaders(frozenset(["name"]))).one()
+        self.assertEqual(sqlalchemy.inspect(model).unloaded, {"data"})
+
+        self.session.expunge_all()
+
+        model = self.session.query(test_klotio.test_models.UnitTest).options(*UnitTest.loaders(frozenset(["yaml"]))).one()
+        self.assertEqual(sqlalchemy.inspect(model).unloaded, {"name"})
+
+    def test_chosen(self):
+
+        unit = self.sample.unittest("unit", {"a": 1})
+        test = self.sample.unittest("test")
+
+        with self.app.test_request_context("/unittest"):
+
+            flask.request.session = self.app.mysql.session()
+
+            self.assertEqual(UnitTest.chosen({}), {"value": (
+                [test.id, unit.id],
+                {test.id: "test", unit.id: "unit"}
+            ), "store": True})
+
+            self.assertEqual(UnitTest.chosen({"name": "unit"}), {"value": (
+                [unit.id],
+                {unit.id: "unit"}
+            ), "store": True})
+
+            flask.request.session.info["replica"] = {"host": "replica"}
+
+            self.assertFalse(UnitTest.chosen({})["store"])
+
+            flask.request.session.close()
+
+    def test_cached(self):
+
+        with self.app.test_request_context("/unittest?a=1"):
+
+            flask.request.session = klotio.service.LazySession(self.app.mysql, readonly=True)
+
+            self.assertEqual(UnitTest.cached(), (None, None))
+            self.assertTrue(flask.request.session.replica)
+
+            with unittest.mock.patch.object(UnitTest, "CACHE", 30):
+
+                self.assertEqual(UnitTest.cached(), ("zee/unittest/0/?a=1", None))
+                self.assertFalse(flask.request.session.replica)
+
+                self.assertEqual(UnitTest.cache("zee/unittest/0/?a=1", "abc", {"a": 1}, 200, {"Link": "next"}), ({"a": 1}, 200, {
+                    "Link": "next",
+                    "ETag": '"abc"',
+                    "Cache-Control": "no-cache"
+                }))
+
+                UnitTest.cache("zee/unittest/3/?a=1", "def", {"b": 2}, 400)
+
+                self.assertEqual(UnitTest.cached(), ("zee/unittest/0/?a=1", {
+                    "tag": "abc",
+                    "response": {"a": 1},
+                    "headers": {"Link": "next"}
+                }))
+                self.assertNotIn("zee/unittest/3/?a=1", self.app.redis.data)
+
+                flask.request.session.info["replica"] = {"host": "replica"}
+
+                UnitTest.cache("zee/unittest/4/?a=1", "ghi", {"c": 3})
+                self.assertNotIn("zee/unittest/4/?a=1", self.app.redis.data)
+
+                flask.request.session.close()
+
+    def test_extract(self):
+
+        self.assertRaisesRegex(ValueError, "invalid data key 'a.b'", UnitTest.extract, "a.b")
+
+        self.assertEqual(
+            str(UnitTest.extract("a")),
+            "json_unquote(json_extract(unittest.data, :json_extract_1))"
+        )
+
+        with unittest.mock.patch.object(UnitTest, "MODEL", test_klotio.test_models.Indexed):
+            self.assertIs(UnitTest.extract("color"), test_klotio.test_models.Indexed.__table__.columns["color"])
+            self.assertIsNot(UnitTest.extract("shade"), test_klotio.test_models.Indexed.__table__.columns["color"])
+            self.assertIs(UnitTest.extract("color", unquote=False), test_klotio.test_models.Indexed.__table__.columns["color"])
+
+        self.assertEqual(
+            str(UnitTest.extract("a", unquote=False)),
+            "json_extract(unittest.data, :json_extract_1)"
+        )
+
+    def test_number(self):
+
+        self.assertEqual(UnitTest.number("10"), 10)
+        self.assertEqual(UnitTest.number("1.5"), 1.5)
+        self.assertEqual(UnitTest.number("-2"), -2)
+        self.assertEqual(UnitTest.number("1e3"), 1000.0)
+        self.assertIsNone(UnitTest.number("a"))
+
+        for value in ["inf", "-inf", "nan", "1e999", "1_000", " 1", "0x10"]:
+            self.assertIsNone(UnitTest.number(value), value)
+
+    def test_ranged(self):
+
+        column, value = UnitTest.ranged("data.a", "10")
+        self.assertEqual(str(column), "json_extract(unittest.data, :json_extract_1)")
+        self.assertEqual(value, 10)
+
+        column, value = UnitTest.ranged("data.a", "b")
+        self.assertEqual(str(column), str(UnitTest.extract("a")))
+        self.assertEqual(value, "b")
+
+        column, value = UnitTest.ranged("name", "10")
+        self.assertIs(column, test_klotio.test_models.UnitTest.__table__.columns["name"])
+        self.assertEqual(value, "10")
+
+    def test_filter(self):
+
+        unit = self.sample.unittest("unit", {"a": 1, "b": "yes"})
+        self.sample.unittest("test", {"a": 2})
+
+        with self.app.test_request_context("/unittest"):
+
+            flask.request.session = self.app.mysql.session()
+
+            query = flask.request.session.query(UnitTest.MODEL.id)
+
+            self.assertEqual(UnitTest.filter(query, {"name": "unit"}).all(), [(unit.id,)])
+            self.assertEqual(UnitTest.filter(query, {"data.a": "1"}).all(), [(unit.id,)])
+            self.assertEqual(UnitTest.filter(query, {"data.b": "yes", "name": "unit"}).all(), [(unit.id,)])
+            self.assertEqual(UnitTest.filter(query, {"data.b": "no"}).all(), [])
+
+            flask.request.session.close()
+
+    def test_column(self):
+
+        self.assertIs(UnitTest.column("name"), test_klotio.test_models.UnitTest.__table__.columns["name"])
+        self.assertEqual(str(UnitTest.column("data.a")), str(UnitTest.extract("a")))
+        self.assertRaisesRegex(ValueError, "invalid filter 'nope'", UnitTest.column, "nope")
+
+    def test_operate(self):
+
+        column = test_klotio.test_models.UnitTest.__table__.columns["name"]
+
+        for operator, value, sql in [
+            ("in", "a,b", "unittest.name IN (:name_1, :name_2)"),
+            ("ne", "a", "unittest.name != :name_1"),
+            ("gt", "a", "unittest.name > :name_1"),
+            ("gte", "a", "unittest.name >= :name_1"),
+            ("lt", "a", "unittest.name < :name_1"),
+            ("lte", "a", "unittest.name <= :name_1"),
+            ("like", "%a%", "unittest.name LIKE :name_1"),
+            ("prefix", "a_", "unittest.name LIKE :name_1 ESCAPE '\\'"),
+            ("null", "true", "unittest.name IS NULL"),
+            ("null", "false", "unittest.name IS NOT NULL")
+        ]:
+            self.assertEqual(str(UnitTest.operate(column, operator, value)), sql, operator)
+
+        self.assertEqual(
+            UnitTest.operate(column, "prefix", "a_%\\").right.value,
+            "a\\_\\%\\\\%"
+        )
+
+    @unittest.mock.patch.object(UnitTest, "FILTERS", ["name", "data.a"])
+    def test_filter_operators(self):
+
+        a = self.sample.unittest("a", {"a": 1})
+        b = self.sample.unittest("b_", {"a": 2})
+        c = self.sample.unittest("bc", {"a": 10})
+
+        with self.app.test_request_context("/unittest"):
+
+            flask.request.session = self.app.mysql.session()
+
+            query = flask.request.session.query(UnitTest.MODEL.id).order_by(UnitTest.MODEL.id)
+
+            self.assertEqual(UnitTest.filter(query, {"name__in": "a,bc"}).all(), [(a.id,), (c.id,)])
+            self.assertEqual(UnitTest.filter(query, {"name__ne": "a"}).all(), [(b.id,), (c.id,)])
+            self.assertEqual(UnitTest.filter(query, {"name__gte": "b"}).all(), [(b.id,), (c.id,)])
+            self.assertEqual(UnitTest.filter(query, {"name__lt": "b"}).all(), [(a.id,)])
+            self.assertEqual(UnitTest.filter(query, {"name__like": "b%"}).all(), [(b.id,), (c.id,)])
+            self.assertEqual(UnitTest.filter(query, {"name__prefix": "b_"}).all(), [(b.id,)])
+            self.assertEqual(UnitTest.filter(query, {"name__null": "true"}).all(), [])
+            self.assertEqual(UnitTest.filter(query, {"data.a__in": "1,10"}).all(), [(a.id,), (c.id,)])
+            self.assertEqual(UnitTest.filter(query, {"data.a__gt": "9"}).all(), [(c.id,)])
+            self.assertEqual(UnitTest.filter(query, {"data.a__gte": "2"}).all(), [(b.id,), (c.id,)])
+            self.assertEqual(UnitTest.filter(query, {"data.a__lt": "10"}).all(), [(a.id,), (b.id,)])
+            self.assertEqual(UnitTest.filter(query, {"data.a__lte": "1.5"}).all(), [(a.id,)])
+            self.assertEqual(UnitTest.filter(query, {"data.a__null": "false", "name": "a"}).all(), [(a.id,)])
+
+            self.assertRaisesRegex(ValueError, "invalid filter 'id__gt'", UnitTest.filter, query, {"id__gt": "1"})
+            self.assertRaisesRegex(ValueError, "invalid filter 'name__nope'", UnitTest.filter, query, {"name__nope": "1"})
+
+            flask.request.session.close()
+
+    @unittest.mock.patch.object(UnitTest, "FILTERS", ["name"])
+    def test_ordering(self):
+
+        with self.app.test_request_context("/unittest"):
+            self.assertEqual(UnitTest.ordering(), UnitTest.ORDER)
+
+        with self.app.test_request_context("/unittest?sort=-name,name"):
+            self.assertEqual([str(order) for order in UnitTest.ordering()], [
+                "unittest.name DESC",
+                "unittest.name ASC"
+            ])
+
+        with self.app.test_request_context("/unittest?sort=-id"):
+            self.assertRaisesRegex(ValueError, "invalid sort 'id'", UnitTest.ordering)
+
+    def test_etag(self):
+
+        self.assertEqual(UnitTest.etag("a", 1), UnitTest.etag("a", 1))
+        self.assertNotEqual(UnitTest.etag("a", 1), UnitTest.etag("a", 2))
+        self.assertEqual(UnitTest.etag({"a": 1, "b": 2}), UnitTest.etag({"b": 2, "a": 1}))
+
+    def test_tagged(self):
+
+        with self.app.test_request_context("/unittest"):
+
+            self.assertFalse(UnitTest.unmodified(None))
+            self.assertFalse(UnitTest.unmodified("abc"))
+
+            self.assertEqual(UnitTest.tagged("abc", {"a": 1}, 200, {"Link": "next"}), ({"a": 1}, 200, {
+                "Link": "next",
+                "ETag": '"abc"',
+                "Cache-Control": "no-cache"
+            }))
+
+        with self.app.test_request_context("/unittest", headers={"If-None-Match": '"abc"'}):
+
+            self.assertTrue(UnitTest.unmodified("abc"))
+
+            response = UnitTest.tagged("abc", {"a": 1})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.headers["ETag"], '"abc"')
+
+            self.assertEqual(UnitTest.tagged(None, {"a": 1}), ({"a": 1}, 200, {"Cache-Control": "no-cache"}))
+
+    @unittest.mock.patch.object(UnitTest, "VERSION", "name")
+    def test_version(self):
+
+        unit = self.sample.unittest("unit")
+
+        with self.app.test_request_context("/unittest"):
+
+            flask.request.session = self.app.mysql.session()
+
+            tag = UnitTest.version(unit.id)
+
+            self.assertEqual(tag, UnitTest.version(unit.id))
+            self.assertNotEqual(tag, UnitTest.version(unit.id, frozenset(["name"])))
+            self.assertIsNone(UnitTest.version(0))
+
+            flask.request.session.query(UnitTest.MODEL).filter_by(id=unit.id).update({"name": "unity"})
+            flask.request.session.commit()
+
+            self.assertNotEqual(tag, UnitTest.version(unit.id))
+
+            flask.request.session.close()
+
+        with self.app.test_request_context("/unittest"):
+
+            flask.request.session = self.app.mysql.session()
+
+            with unittest.mock.patch.object(UnitTest, "VERSION", None):
+                self.assertIsNone(UnitTest.version(unit.id))
+
+            flask.request.session.close()
+
+    @unittest.mock.patch.object(UnitTest, "VERSION", "name")
+    def test_versions(self):
+
+        self.sample.unittest("unit")
+
+        with self.app.test_request_context("/unittest"):
+
+            flask.request.session = self.app.mysql.session()
+
+            tag = UnitTest.versions({})
+
+            self.assertEqual(tag, UnitTest.versions({}))
+            self.assertNotEqual(tag, UnitTest.versions({"name": "nope"}))
+
+            self.sample.unittest("zzz")
+
+            self.assertNotEqual(tag, UnitTest.versions({}))
+
+            flask.request.session.close()
+
+        with self.app.test_request_context("/unittest"):
+
+            flask.request.session = self.app.mysql.session()
+
+            with unittest.mock.patch.object(UnitTest, "VERSION", None):
+                self.assertIsNone(UnitTest.versions({}))
+
+            flask.request.session.close()
+
+    def test_choices(self):
+
+        unit = self.sample.unittest("unit")
+        test = self.sample.unittest("test")
+
+        @klotio.service.require_session
+        def choices():
+            response = flask.make_response(json.dumps({"choices": UnitTest.choices()}))
+            response.headers.set('Content-Type', 'application/json')
+            response.status_code = 200
+            return response
+
+        self.app.add_url_rule('/choices', 'choices', choices)
+
+        self.assertStatusValue(self.api.get("/choices"), 200, "choices", [
+            [test.id, unit.id],
+            {str(test.id): "test", str(unit.id): "unit"}
+        ])
+
+        self.assertIsNotNone(klotio.service.listener.thread)
+
+        self.sample.unittest("more")
+
+        self.assertStatusValue(self.api.get("/choices"), 200, "choices", [
+            [test.id, unit.id],
+            {str(test.id): "test", str(unit.id): "unit"}
+        ])
+        self.assertEqual(klotio.service.choices.stats()["hits"], 1)
+
+        self.assertStatusValue(self.api.get("/choices?name=unit"), 200, "choices", [
+            [unit.id],
+            {str(unit.id): "unit"}
+        ])
+
+        self.api.post("/unittest", json={"unittest": {"name": "post"}})
+
+        self.assertEqual(len(self.api.get("/choices").json["choices"][0]), 4)
+
+    def test_invalidate(self):
+
+        klotio.service.choices.entries = {
+            "unittest:{}": {},
+            "unittests:{}": {}
+        }
+
+        with self.app.test_request_context("/unittest"):
+            UnitTest.invalidate()
+            klotio.service.publisher().flush()
+
+        self.assertEqual(list(klotio.service.choices.entries.keys()), ["unittests:{}"])
+        self.assertEqual(json.loads(self.app.redis.messages[-1]), {"invalidate": "unittest"})
+        self.assertNotIn("zee/unittest", self.app.redis.data)
+
+        with self.app.test_request_context("/unittest"), unittest.mock.patch.object(UnitTest, "CACHE", 30):
+            UnitTest.invalidate()
+
+        self.assertEqual(self.app.redis.data["zee/unittest"], b"1")
+
+    def test_changed(self):
+
+        with self.app.test_request_context("/unittest"):
+            UnitTest.changed("update", [1, 2])
+            klotio.service.publisher().flush()
+
+        self.assertEqual([json.loads(message) for message in self.app.redis.messages], [
+            {"model": "unittest", "action": "update", "id": 1},
+            {"model": "unittest", "action": "update", "id": 2}
+        ])
+
+    def test_invalidated(self):
+
+        klotio.service.choices.entries = {
+            "unittest:{}": {},
+            "unittests:{}": {}
+        }
+
+        UnitTest.invalidated({"nope": "unittests"})
+        self.assertEqual(len(klotio.service.choices.entries), 2)
+
+        UnitTest.invalidated({"invalidate": "unittests"})
+        self.assertEqual(list(klotio.service.choices.entries.keys()), ["unittest:{}"])
+
+    @unittest.mock.patch("klotio.service.client.options")
+    def test_derive(self, mock_options):
+
+        mock_options.return_value.json.return_value = "yep"
+        mock_options.return_value.headers = {}
+
+        self.assertEqual(UnitTest.derive({"url": "sure"}), "yep")
+        mock_options.assert_has_calls([
+            unittest.mock.call("sure", headers={}, timeout=5.0, retry=False),
+            unittest.mock.call().raise_for_status(),
+            unittest.mock.call().json()
+        ])
+
+        self.assertEqual(UnitTest.derive({"node": "sure"}), "yep")
+        mock_options.assert_has_calls([
+            unittest.mock.call("http://api.klot-io/node", params="sure", headers={}, timeout=5.0, retry=False),
+            unittest.mock.call().raise_for_status(),
+            unittest.mock.call().json()
+        ])
+
+        self.assertEqual(UnitTest.derive({"url": "sure"}), "yep")
+        self.assertEqual(mock_options.call_count, 2)
+        self.assertEqual(klotio.service.derivations.stats(), {"hits": 1, "stales": 0, "misses": 2, "entries": 2})
+
+    @unittest.mock.patch("klotio.service.client.options")
+    def test_derivation(self, mock_options):
+
+        mock_options.return_value.status_code = 200
+        mock_options.return_value.json.return_value = "yep"
+        mock_options.return_value.headers = {
+            "ETag": '"abc"',
+            "Cache-Control": "max-age=30, stale-while-revalidate=60"
+        }
+
+        self.assertEqual(UnitTest.derivation({"url": "sure"}), {
+            "value": "yep",
+            "etag": '"abc"',
+            "ttl": 30,
+            "stale": 60
+        })
+
+        mock_options.return_value.status_code = 304
+        mock_options.return_value.headers = {"ETag": '"abc"'}
+
+        self.assertEqual(UnitTest.derivation({"node": "sure"}, {"value": "cached", "etag": '"abc"'}), {
+            "value": "cached",
+            "etag": '"abc"'
+        })
+
+        mock_options.assert_called_with(
+            "http://api.klot-io/node", params="sure", headers={"If-None-Match": '"abc"'}, timeout=5.0, retry=False
+        )
+
+    @unittest.mock.patch("klotio.service.client.options")
+    def test_derived(self, mock_options):
+
+        mock_options.return_value.json.return_value = {"name": "yep"}
+        mock_options.return_value.headers = {}
+
+        self.assertIsNone(UnitTest.derived({"url": "sure"}))
+
+        UnitTest.derive({"url": "sure"})
+
+        derived = UnitTest.derived({"url": "sure"})
+        self.assertEqual(derived, {"name": "yep"})
+
+        derived["name"] = "nope"
+        self.assertEqual(UnitTest.derived({"url": "sure"}), {"name": "yep"})
+
+    def test_underived(self):
+
+        integrations = [
+            {
+                "integrate": {
+                    "url": "sure"
+                }
+            },
+            {
+                "fields": [
+                    {
+                        "integrate": {
+                            "node": "yep"
+                        }
+                    },
+                    {
+                        "name": "plain"
+                    }
+                ]
+            }
+        ]
+
+        self.assertEqual(UnitTest.underived(integrations), [
+            {
+                "integrate": {
+                    "url": "sure"
+                }
+            },
+            {
+                "integrate": {
+                    "node": "yep"
+                }
+            }
+        ])
+
+    @unittest.mock.patch("klotio.service.Model.DEADLINE", 0.1)
+    @unittest.mock.patch("klotio.service.Model.derive")
+    def test_integrates(self, mock_derive):
+
+        released = threading.Event()
+
+        def derive(integrate):
+
+            if integrate["url"] == "slow":
+                released.wait(5)
+
+            return {"description": integrate["url"]}
+
+        mock_derive.side_effect = derive
+
+        self.assertEqual(UnitTest.integrates([
+            {
+                "integrate": {
+                    "url": "slow"
+                }
+            },
+            {
+                "integrate": {
+                    "url": "fast"
+                }
+            }
+        ]), [
+            {
+                "integrate": {
+                    "url": "slow"
+                },
+                "errors": ["failed to integrate: timed out"]
+            },
+            {
+                "integrate": {
+                    "url": "fast"
+                },
+                "description": "fast"
+            }
+        ])
+
+        released.set()
+
+    @unittest.mock.patch("klotio.service.client.options")
+    def test_integrate(self, mock_options):
+
+        def options(url, params=None, headers=None, timeout=None, retry=True):
+
+            response = unittest.mock.MagicMock()
+            response.headers = {}
+
+            if url == "sure":
+
+                response.json.return_value = {
+                    "fields": [
+                        {
+                            "integrate": {
+                                "node": "yep"
+                            }
+                        },
+                        {
+                            "integrate": {
+                                "url": "nope"
+                            }
+                        }
+                    ]
+                }
+
+            elif url == "http://api.klot-io/node" and params == "yep":
+
+                response.json.return_value = {
+                    "name": "master"
+                }
+
+            elif url == "nope":
+
+                response.raise_for_status.side_effect = Exception("whoops")
+
+            return response
+
+        mock_options.side_effect = options
+
+        self.assertEqual(UnitTest.integrate({
+            "integrate": {
+                "url": "sure"
+            }
+        }), {
+            "integrate": {
+                "url": "sure"
+            },
+            "fields": [
+                {
+                    "integrate": {
+                        "node": "yep"
+                    },
+                    "name": "master"
+                },
+                {
+                    "integrate": {
+                        "url": "nope"
+                    },
+                    "errors": ["failed to integrate: whoops"]
+                }
+            ]
+        })
+
+    @unittest.mock.patch("glob.glob")
+    @unittest.mock.patch("klotio.service.open", create=True)
+    @unittest.mock.patch("klotio.service.client.options")
+    def test_integrations(self, mock_options, mock_open, mock_glob):
+
+        mock_glob.return_value = ["/opt/service/config/integration_unit.test_unittest.fields.yaml"]
+
+        mock_open.side_effect = [
+            unittest.mock.mock_open(read_data=yaml.safe_dump({
+                "integrate": {
+                    "url": "sure"
+                }
+            })).return_value
+        ]
+
+        def options(url, params=None, headers=None, timeout=None, retry=True):
+
+            response = unittest.mock.MagicMock()
+            response.headers = {}
+
+            if url == "sure":
+
+                response.json.return_value = {
+                    "fields": [
+                        {
+                            "integrate": {
+                                "node": "yep"
+                            }
+                        },
+                        {
+                            "integrate": {
+                                "url": "nope"
+                            }
+                        }
+                    ]
+                }
+
+            elif url == "http://api.klot-io/node" and params == "yep":
+
+                response.json.return_value = {
+                    "name": "master"
+                }
+
+            elif url == "nope":
+
+                response.raise_for_status.side_effect = Exception("whoops")
+
+            return response
+
+        mock_options.side_effect = options
+
+        self.assertEqual(UnitTest.integrations(), [
+            {
+                "name": "unit.test",
+                "integrate": {
+                    "url": "sure"
+                },
+                "fields": [
+                    {
                         "integrate": {
                             "node": "yep"
                         },
@@ -488,6 +2331,43 @@ class TestModel(TestRest):
 
         mock_open.assert_called_once_with("/opt/service/config/integration_unit.test_unittest.fields.yaml", "r")
 
+    @unittest.mock.patch("klotio.service.Model.integrations")
+    def test_schema(self, mock_integrations):
+
+        mock_integrations.return_value = [{"name": "unit.test"}]
+
+        klotio.service.integrations.entry("unittest")
+
+        schema = UnitTest.schema()
+        self.assertEqual(schema.fields, (
+            {
+                "name": "name"
+            },
+            {
+                "name": "unit.test"
+            },
+            {
+                "name": "yaml",
+                "style": "textarea",
+                "optional": True
+            }
+        ))
+        self.assertEqual(schema.names, frozenset(["unit.test"]))
+
+        self.assertIs(UnitTest.schema(), schema)
+        mock_integrations.assert_called_once_with()
+
+        schema.verified = 0
+        mock_integrations.return_value = [{"name": "unit.test"}]
+        self.assertIs(UnitTest.schema(), schema)
+        self.assertEqual(mock_integrations.call_count, 2)
+
+        klotio.service.derivations.generation += 1
+        mock_integrations.return_value = [{"name": "unit.test", "description": "changed"}]
+        self.assertIsNot(UnitTest.schema(), schema)
+        self.assertEqual(UnitTest.schema().lookup["unit.test"], {"name": "unit.test", "description": "changed"})
+        self.assertEqual(mock_integrations.call_count, 3)
+
     @unittest.mock.patch("glob.glob")
     @unittest.mock.patch("klotio.service.open", create=True)
     def test_request(self, mock_open, mock_glob):
@@ -556,6 +2436,50 @@ class TestModel(TestRest):
             "yaml": yaml.dump({"d": 4}, default_flow_style=False)
         })
 
+    @unittest.mock.patch("glob.glob")
+    @unittest.mock.patch("klotio.service.open", create=True)
+    def test_response_fields(self, mock_open, mock_glob):
+
+        mock_glob.return_value = ["/opt/service/config/integration_unit.test_unittest.fields.yaml"]
+
+        mock_open.side_effect = [
+            unittest.mock.mock_open(read_data=yaml.safe_dump({
+                "description": "Mock integraton",
+                "fields": [{
+                    "name": "integrate"
+                }]
+            })).return_value
+        ]
+
+        unitest = self.sample.unittest(
+            "unit",
+            data={
+                "d": 4,
+                "unit.test": {
+                    "integrate": "yep"
+                }
+            }
+        )
+
+        self.assertEqual(UnitTest.response(unitest, fields=frozenset(["id", "name"])), {
+            "id": unitest.id,
+            "name": "unit"
+        })
+
+        self.assertEqual(UnitTest.response(unitest, fields=frozenset(["name", "unit.test"])), {
+            "name": "unit",
+            "unit.test": {
+                "integrate": "yep"
+            }
+        })
+
+        self.assertEqual(UnitTest.response(unitest, fields=frozenset(["data", "yaml"])), {
+            "data": {
+                "d": 4
+            },
+            "yaml": yaml.dump({"d": 4}, default_flow_style=False)
+        })
+
     @unittest.mock.patch("glob.glob")
     @unittest.mock.patch("klotio.service.open", create=True)
     def test_responses(self, mock_open, mock_glob):
@@ -589,10 +2513,37 @@ class TestModel(TestRest):
             },
             "data": {
                 "d": 4
-            },
+            }
+        }])
+
+        self.assertEqual(UnitTest.responses([unitest], frozenset(["name", "yaml"])), [{
+            "name": "unit",
             "yaml": yaml.dump({"d": 4}, default_flow_style=False)
         }])
 
+        with unittest.mock.patch.object(UnitTest, "LIST_YAML", True):
+
+            self.assertEqual(UnitTest.responses([unitest]), [{
+                "id": unitest.id,
+                "name": "unit",
+                "unit.test": {
+                    "integrate": "yep"
+                },
+                "data": {
+                    "d": 4
+                },
+                "yaml": yaml.dump({"d": 4}, default_flow_style=False)
+            }])
+
+    def test_rendered(self):
+
+        self.assertFalse(UnitTest.rendered())
+        self.assertFalse(UnitTest.rendered(frozenset(["name"])))
+        self.assertTrue(UnitTest.rendered(frozenset(["yaml"])))
+
+        with unittest.mock.patch.object(UnitTest, "LIST_YAML", True):
+            self.assertTrue(UnitTest.rendered())
+
 
 class TestRestCL(TestRest):
 
@@ -690,6 +2641,208 @@ class TestRestCL(TestRest):
 
         unittest_id = response.json["unittest"]["id"]
 
+    def test_batches(self):
+
+        self.assertEqual(UnitTestCL.batches([
+            {"name": "a"},
+            {"name": "b", "data": {}},
+            {"data": {}, "name": "c"}
+        ]), [
+            [{"name": "a"}],
+            [{"name": "b", "data": {}}, {"data": {}, "name": "c"}]
+        ])
+
+    def test_status(self):
+
+        self.assertEqual(UnitTestCL.status([{"status": 201}], 201), 201)
+        self.assertEqual(UnitTestCL.status([{"status": 201}, {"status": 400}], 201), 207)
+        self.assertEqual(UnitTestCL.status([{"status": 400}], 201), 400)
+        self.assertEqual(UnitTestCL.status([], 201), 201)
+
+    def test_post_bulk(self):
+
+        response = self.api.post("/unittest", json={
+            "unittests": [
+                {
+                    "name": "unit",
+                    "yaml": "a: 1"
+                },
+                {
+                    "nope": "bad"
+                },
+                {
+                    "name": "test"
+                },
+                "bad"
+            ]
+        })
+
+        self.assertEqual(response.status_code, 207, response.json)
+        self.assertEqual(response.json["created"], 2)
+        self.assertEqual([result["status"] for result in response.json["unittests"]], [201, 400, 201, 400])
+        self.assertEqual(response.json["unittests"][1]["errors"], ["unknown field 'nope'"])
+        self.assertEqual(response.json["unittests"][3]["errors"], ["must be dict"])
+
+        self.assertNotIn("id", response.json["unittests"][0])
+
+        self.assertStatusModels(self.api.get("/unittest"), 200, "unittests", [
+            {
+                "name": "test",
+                "data": {}
+            },
+            {
+                "name": "unit",
+                "data": {"a": 1}
+            }
+        ])
+
+        self.assertEqual(self.api.post("/unittest", json={"unittests": [{"name": "more"}]}).status_code, 201)
+
+        response = self.api.post("/unittest?ids=true", json={"unittests": [{"name": "most"}, {"nope": "bad"}, {"name": "mostest"}]})
+        self.assertEqual(response.status_code, 207, response.json)
+
+        units = {
+            model.name: model.id
+            for model in self.session.query(test_klotio.test_models.UnitTest).all()
+        }
+
+        self.assertEqual(response.json["unittests"][0], {"status": 201, "id": units["most"]})
+        self.assertNotIn("id", response.json["unittests"][1])
+        self.assertEqual(response.json["unittests"][2], {"status": 201, "id": units["mostest"]})
+
+    def test_patch_bulk(self):
+
+        unit = self.sample.unittest("unit")
+        test = self.sample.unittest("test")
+
+        response = self.api.patch("/unittest", json={
+            "unittests": [
+                {
+                    "id": unit.id,
+                    "name": "unity"
+                },
+                {
+                    "id": test.id,
+                    "name": "testy",
+                    "yaml": "b: 2"
+                },
+                {
+                    "name": "noid"
+                },
+                {
+                    "id": 0,
+                    "name": "gone"
+                },
+                {
+                    "id": unit.id
+                }
+            ]
+        })
+
+        self.assertEqual(response.status_code, 207, response.json)
+        self.assertEqual(response.json["updated"], 2)
+        self.assertEqual(response.json["unittests"], [
+            {"status": 202},
+            {"status": 202},
+            {"status": 400, "errors": ["missing id"]},
+            {"status": 404},
+            {"status": 202}
+        ])
+
+        self.assertStatusModels(self.api.get("/unittest"), 200, "unittests", [
+            {
+                "name": "testy",
+                "data": {"b": 2}
+            },
+            {
+                "name": "unity"
+            }
+        ])
+
+    def test_delete_bulk(self):
+
+        unit = self.sample.unittest("unit")
+        test = self.sample.unittest("test")
+
+        response = self.api.delete("/unittest", json={
+            "unittests": [unit.id, {"id": test.id}, 0]
+        })
+
+        self.assertEqual(response.status_code, 207, response.json)
+        self.assertEqual(response.json, {
+            "deleted": 2,
+            "unittests": [
+                {"status": 202},
+                {"status": 202},
+                {"status": 404}
+            ]
+        })
+
+        self.assertStatusModels(self.api.get("/unittest"), 200, "unittests", [])
+
+        self.assertEqual(self.api.delete("/unittest", json={"unittests": [unit.id]}).status_code, 400)
+
+    def test_changes(self):
+
+        unit = self.api.post("/unittest", json={"unittest": {"name": "unit"}}).json["unittest"]
+        test, more = self.api.post("/unittest?ids=true", json={"unittests": [{"name": "test"}, {"name": "more"}]}).json["unittests"]
+        self.api.post("/unittest", json={"unittests": [{"name": "most"}]})
+
+        self.api.patch("/unittest", json={"unittests": [{"id": unit["id"], "name": "unity"}, {"id": 0, "name": "gone"}]})
+        self.api.delete("/unittest", json={"unittests": [test["id"], unit["id"], 0]})
+
+        self.assertEqual(self.changes(), [
+            {"model": "unittest", "action": "create", "id": unit["id"]},
+            {"model": "unittest", "action": "create", "id": test["id"]},
+            {"model": "unittest", "action": "create", "id": more["id"]},
+            {"model": "unittest", "action": "create", "id": None},
+            {"model": "unittest", "action": "update", "id": unit["id"]},
+            {"model": "unittest", "action": "delete", "id": min(unit["id"], test["id"])},
+            {"model": "unittest", "action": "delete", "id": max(unit["id"], test["id"])}
+        ])
+
+    def test_keyset(self):
+
+        self.assertEqual(UnitTestCL.keyset(), [
+            (test_klotio.test_models.UnitTest.name, False),
+            (test_klotio.test_models.UnitTest.__table__.columns["id"], False)
+        ])
+
+        with unittest.mock.patch.object(UnitTestCL, "ORDER", [
+            test_klotio.test_models.UnitTest.name.desc(),
+            test_klotio.test_models.UnitTest.id.asc()
+        ]):
+
+            keyset = UnitTestCL.keyset()
+
+            self.assertEqual(len(keyset), 2)
+            self.assertEqual(keyset[0][0].key, "name")
+            self.assertTrue(keyset[0][1])
+            self.assertEqual(keyset[1][0].key, "id")
+            self.assertFalse(keyset[1][1])
+
+    def test_cursor(self):
+
+        unit = self.sample.unittest("unit")
+        keyset = UnitTestCL.keyset()
+
+        cursor = UnitTestCL.cursor(keyset, unit)
+
+        self.assertEqual(UnitTestCL.uncursor(keyset, cursor), ["unit", unit.id])
+
+        self.assertRaisesRegex(ValueError, "invalid cursor", UnitTestCL.uncursor, keyset, UnitTestCL.cursor(keyset[:1], unit))
+        self.assertRaisesRegex(ValueError, "invalid cursor", UnitTestCL.uncursor, keyset, "nope")
+
+    def test_seek(self):
+
+        self.assertEqual(
+            str(UnitTestCL.seek([
+                (test_klotio.test_models.UnitTest.name, True),
+                (test_klotio.test_models.UnitTest.id, False)
+            ], ["unit", 1])),
+            "unittest.name < :name_1 OR unittest.name = :name_2 AND unittest.id > :id_1"
+        )
+
     def test_get(self):
 
         self.sample.unittest("unit")
@@ -704,6 +2857,257 @@ class TestRestCL(TestRest):
             }
         ])
 
+    def test_get_data(self):
+
+        self.sample.unittest("unit", {"a": 1})
+        self.sample.unittest("test", {"a": 2})
+
+        self.assertStatusModels(self.api.get("/unittest?data.a=2"), 200, "unittests", [{"name": "test"}])
+        self.assertStatusModels(self.api.get("/unittest?data.a=2&name=unit"), 200, "unittests", [])
+        self.assertStatusValue(self.api.get("/unittest?data.a.b=2"), 400, "message", "invalid data key 'a.b'")
+
+    @unittest.mock.patch.object(UnitTest, "FILTERS", ["name", "data.a"])
+    def test_total(self):
+
+        self.sample.unittest("a", {"a": 1})
+        self.sample.unittest("b", {"a": 1})
+        self.sample.unittest("c", {"a": 2})
+
+        with self.app.test_request_context("/unittest"):
+
+            flask.request.session = self.app.mysql.session()
+
+            self.assertEqual(UnitTestCL().total({}), 3)
+            self.assertEqual(UnitTestCL().total({"data.a": "1"}), 2)
+            self.assertEqual(UnitTestCL().total({"name__in": "b,c", "data.a__ne": "1"}), 1)
+
+            flask.request.session.close()
+
+    @unittest.mock.patch.object(UnitTest, "FILTERS", ["name", "data.a"])
+    def test_grouped(self):
+
+        self.sample.unittest("a", {"a": 1})
+        self.sample.unittest("b", {"a": 1})
+        self.sample.unittest("c", {"a": 2})
+        self.sample.unittest("d")
+
+        with self.app.test_request_context("/unittest"):
+
+            flask.request.session = self.app.mysql.session()
+
+            self.assertEqual(UnitTestCL().grouped({}, "data.a"), [
+                {"data.a": None, "count": 1},
+                {"data.a": "1", "count": 2},
+                {"data.a": "2", "count": 1}
+            ])
+
+            self.assertEqual(UnitTestCL().grouped({"name__ne": "a"}, "name"), [
+                {"name": "b", "count": 1},
+                {"name": "c", "count": 1},
+                {"name": "d", "count": 1}
+            ])
+
+            self.assertRaisesRegex(ValueError, "invalid count_by 'id'", UnitTestCL().grouped, {}, "id")
+
+            flask.request.session.close()
+
+    @unittest.mock.patch.object(UnitTest, "FILTERS", ["name"])
+    def test_head(self):
+
+        for name in ["a", "b", "c"]:
+            self.sample.unittest(name)
+
+        response = self.api.head("/unittest?name__ne=b")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Total-Count"], "2")
+        self.assertEqual(response.data, b"")
+
+        self.assertEqual(self.api.head("/unittest?id__gt=1").status_code, 400)
+
+    @unittest.mock.patch.object(UnitTest, "FILTERS", ["name"])
+    def test_get_count(self):
+
+        for name in ["a", "b", "c"]:
+            self.sample.unittest(name)
+
+        response = self.api.get("/unittest?count=true&name__in=a,b")
+        self.assertStatusValue(response, 200, "count", 2)
+        self.assertEqual(response.headers["X-Total-Count"], "2")
+
+        self.assertStatusValue(self.api.get("/unittest?count_by=name&name__ne=c"), 200, "counts", [
+            {"name": "a", "count": 1},
+            {"name": "b", "count": 1}
+        ])
+
+        self.assertStatusValue(self.api.get("/unittest?count=true&id__gt=1"), 400, "message", "invalid filter 'id__gt'")
+        self.assertStatusValue(self.api.get("/unittest?count_by=id"), 400, "message", "invalid count_by 'id'")
+
+    @unittest.mock.patch.object(UnitTest, "FILTERS", ["name"])
+    def test_get_filters(self):
+
+        for name in ["a", "b", "c", "d"]:
+            self.sample.unittest(name)
+
+        self.assertStatusModels(self.api.get("/unittest?name__in=a,c,d&sort=-name"), 200, "unittests", [
+            {"name": "d"},
+            {"name": "c"},
+            {"name": "a"}
+        ])
+
+        response = self.api.get("/unittest?name__gt=a&sort=-name&limit=2")
+        self.assertStatusModels(response, 200, "unittests", [{"name": "d"}, {"name": "c"}])
+        self.assertStatusModels(self.api.get(f"/unittest{response.json['next']}"), 200, "unittests", [{"name": "b"}])
+
+        self.assertStatusModels(self.api.get("/unittest?name__lte=b&sort=-name&stream=true"), 200, "unittests", [
+            {"name": "b"},
+            {"name": "a"}
+        ])
+
+        self.assertStatusValue(self.api.get("/unittest?id__gt=1"), 400, "message", "invalid filter 'id__gt'")
+        self.assertStatusValue(self.api.get("/unittest?sort=id"), 400, "message", "invalid sort 'id'")
+
+    def test_get_fields(self):
+
+        unit = self.sample.unittest("unit", {"a": 1})
+
+        self.assertEqual(self.api.get("/unittest?fields=id,name").json, {"unittests": [{
+            "id": unit.id,
+            "name": "unit"
+        }]})
+
+        self.assertEqual(self.api.get("/unittest?fields=name,yaml&stream=true").json, {"unittests": [{
+            "name": "unit",
+            "yaml": "a: 1\n"
+        }]})
+
+    @unittest.mock.patch("klotio.service.Model.CHUNK", 2)
+    def test_get_stream(self):
+
+        for name in ["e", "d", "c", "b", "a"]:
+            self.sample.unittest(name, {"x": name})
+
+        response = self.api.get("/unittest?stream=true")
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.headers["Content-Type"], "application/json")
+        self.assertNotIn("Content-Length", response.headers)
+
+        self.assertStatusModels(response, 200, "unittests", [
+            {
+                "name": name,
+                "data": {"x": name}
+            } for name in ["a", "b", "c", "d", "e"]
+        ])
+        self.assertEqual(len(response.json["unittests"]), 5)
+        self.assertNotIn("yaml", response.json["unittests"][0])
+
+        self.assertStatusModels(self.api.get("/unittest?stream=true&name=nope"), 200, "unittests", [])
+        self.assertEqual(self.api.get("/unittest?stream=true&name=nope").json, {"unittests": []})
+
+    def test_get_etag(self):
+
+        self.sample.unittest("unit")
+
+        with unittest.mock.patch("klotio.service.Model.etag") as mock_etag:
+            response = self.api.get("/unittest")
+            mock_etag.assert_not_called()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], f'"{hashlib.md5(response.data).hexdigest()}"')
+        tag = response.headers["ETag"]
+
+        self.assertEqual(self.api.get("/unittest", headers={"If-None-Match": tag}).status_code, 304)
+
+        self.sample.unittest("test")
+
+        response = self.api.get("/unittest", headers={"If-None-Match": tag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], tag)
+
+        with unittest.mock.patch.object(UnitTest, "VERSION", "name"):
+
+            tag = self.api.get("/unittest?limit=1").headers["ETag"]
+
+            response = self.api.get("/unittest?limit=1", headers={"If-None-Match": tag})
+            self.assertEqual(response.status_code, 304)
+
+            self.assertNotEqual(self.api.get("/unittest?limit=2").headers["ETag"], tag)
+
+        self.assertNotIn("ETag", self.api.get("/unittest?stream=true").headers)
+
+    @unittest.mock.patch.object(UnitTest, "CACHE", 30)
+    def test_get_cache(self):
+
+        self.sample.unittest("unit")
+
+        response = self.api.get("/unittest?name=unit")
+        self.assertStatusModels(response, 200, "unittests", [{"name": "unit"}])
+        tag = response.headers["ETag"]
+
+        with unittest.mock.patch("klotio.service.Model.responses") as mock_responses:
+
+            response = self.api.get("/unittest?name=unit")
+            self.assertStatusModels(response, 200, "unittests", [{"name": "unit"}])
+            self.assertEqual(response.headers["ETag"], tag)
+
+            self.assertEqual(self.api.get("/unittest?name=unit", headers={"If-None-Match": tag}).status_code, 304)
+
+            mock_responses.assert_not_called()
+
+        self.assertStatusModel(self.api.post("/unittest", json={"unittest": {"name": "test"}}), 201, "unittest", {
+            "name": "test"
+        })
+
+        self.assertStatusModels(self.api.get("/unittest"), 200, "unittests", [{"name": "test"}, {"name": "unit"}])
+        self.assertEqual(klotio.service.response_cache.stats()["hits"], 2)
+
+    def test_get_page(self):
+
+        for name in ["a", "b", "c", "d", "e"]:
+            self.sample.unittest(name)
+
+        response = self.api.get("/unittest?limit=2")
+        self.assertStatusModels(response, 200, "unittests", [
+            {
+                "name": "a"
+            },
+            {
+                "name": "b"
+            }
+        ])
+        self.assertEqual(len(response.json["unittests"]), 2)
+        self.assertEqual(response.headers["Link"], f'<{response.json["next"]}>; rel="next"')
+
+        response = self.api.get(f"/unittest{response.json['next']}")
+        self.assertStatusModels(response, 200, "unittests", [
+            {
+                "name": "c"
+            },
+            {
+                "name": "d"
+            }
+        ])
+
+        response = self.api.get(f"/unittest{response.json['next']}")
+        self.assertStatusModels(response, 200, "unittests", [
+            {
+                "name": "e"
+            }
+        ])
+        self.assertEqual(len(response.json["unittests"]), 1)
+        self.assertNotIn("next", response.json)
+        self.assertNotIn("Link", response.headers)
+
+        response = self.api.get("/unittest?limit=2&name=c")
+        self.assertStatusModels(response, 200, "unittests", [
+            {
+                "name": "c"
+            }
+        ])
+        self.assertNotIn("next", response.json)
+
+        self.assertStatusValue(self.api.get("/unittest?limit=0"), 400, "message", "invalid limit '0'")
+        self.assertStatusValue(self.api.get("/unittest?limit=2&after=bad"), 400, "message", "invalid cursor 'bad'")
+
 class TestRestRUD(TestRest):
 
     @unittest.mock.patch("glob.glob")
@@ -824,6 +3228,66 @@ class TestRestRUD(TestRest):
             "name": "unit"
         })
 
+        self.assertEqual(self.api.get(f"/unittest/{unittest.id}?fields=name,data").json, {"unittest": {
+            "name": "unit",
+            "data": {}
+        }})
+
+    def test_get_etag(self):
+
+        unit = self.sample.unittest("unit")
+
+        response = self.api.get(f"/unittest/{unit.id}")
+        self.assertEqual(response.status_code, 200)
+        tag = response.headers["ETag"]
+
+        response = self.api.get(f"/unittest/{unit.id}", headers={"If-None-Match": tag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+        self.api.patch(f"/unittest/{unit.id}", json={"unittest": {"name": "unity"}})
+
+        response = self.api.get(f"/unittest/{unit.id}", headers={"If-None-Match": tag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], tag)
+
+        with unittest.mock.patch.object(UnitTest, "VERSION", "name"):
+
+            tag = self.api.get(f"/unittest/{unit.id}").headers["ETag"]
+
+            with unittest.mock.patch("klotio.service.Model.retrieve") as mock_retrieve:
+                response = self.api.get(f"/unittest/{unit.id}", headers={"If-None-Match": tag})
+                self.assertEqual(response.status_code, 304)
+                mock_retrieve.assert_not_called()
+
+    @unittest.mock.patch.object(UnitTest, "CACHE", 30)
+    def test_get_cache(self):
+
+        unit = self.sample.unittest("unit")
+
+        self.assertStatusModel(self.api.get(f"/unittest/{unit.id}"), 200, "unittest", {"name": "unit"})
+
+        with unittest.mock.patch("klotio.service.Model.retrieve") as mock_retrieve:
+            self.assertStatusModel(self.api.get(f"/unittest/{unit.id}"), 200, "unittest", {"name": "unit"})
+            mock_retrieve.assert_not_called()
+
+        self.api.patch(f"/unittest/{unit.id}", json={"unittest": {"name": "unity"}})
+
+        self.assertStatusModel(self.api.get(f"/unittest/{unit.id}"), 200, "unittest", {"name": "unity"})
+
+    def test_changes(self):
+
+        unit = self.sample.unittest("unit")
+
+        self.api.patch(f"/unittest/{unit.id}", json={"unittest": {"name": "unity"}})
+        self.api.delete(f"/unittest/{unit.id}")
+        self.api.delete(f"/unittest/{unit.id}")
+
+        self.assertEqual(self.changes(), [
+            {"model": "unittest", "action": "update", "id": unit.id},
+            {"model": "unittest", "action": "delete", "id": unit.id}
+        ])
+
     def test_patch(self):
 
         unittest = self.sample.unittest("unit")
@@ -838,6 +3302,61 @@ class TestRestRUD(TestRest):
             "name": "unity"
         })
 
+    def test_merging(self):
+
+        with self.app.test_request_context("/unittest/1", method="PATCH", json={}):
+            self.assertFalse(UnitTestRUD.merging())
+
+        with self.app.test_request_context("/unittest/1?merge=true", method="PATCH", json={}):
+            self.assertTrue(UnitTestRUD.merging())
+
+        with self.app.test_request_context("/unittest/1", method="PATCH", data="{}", content_type="application/merge-patch+json"):
+            self.assertTrue(UnitTestRUD.merging())
+
+    def test_merged(self):
+
+        self.assertEqual(
+            str(UnitTestRUD.merged({"a": 1})),
+            "json_merge_patch(coalesce(unittest.data, :coalesce_1), :json_merge_patch_1)"
+        )
+
+    def test_patch_merge(self):
+
+        unit = self.sample.unittest("unit", {"a": 1, "b": {"c": 2, "d": 3}})
+
+        self.assertStatusValue(self.api.patch(f"/unittest/{unit.id}?merge=true", json={
+            "unittest": {
+                "data": {"a": None, "b": {"c": 4}, "e": 5}
+            }
+        }), 202, "updated", 1)
+
+        self.assertStatusModel(self.api.get(f"/unittest/{unit.id}"), 200, "unittest", {
+            "name": "unit",
+            "data": {"b": {"c": 4, "d": 3}, "e": 5}
+        })
+
+        self.assertStatusValue(self.api.patch(
+            f"/unittest/{unit.id}",
+            data=json.dumps({"name": "unity", "data": {"f": 6}}),
+            content_type="application/merge-patch+json"
+        ), 202, "updated", 1)
+
+        self.assertStatusModel(self.api.get(f"/unittest/{unit.id}"), 200, "unittest", {
+            "name": "unity",
+            "data": {"b": {"c": 4, "d": 3}, "e": 5, "f": 6}
+        })
+
+        self.assertStatusValue(self.api.patch(f"/unittest/{unit.id}?merge=true", json={
+            "unittest": {
+                "name": "unit"
+            }
+        }), 202, "updated", 1)
+
+        self.assertStatusModel(self.api.get(f"/unittest/{unit.id}"), 200, "unittest", {
+            "name": "unit",
+            "data": {"b": {"c": 4, "d": 3}, "e": 5, "f": 6}
+        })
+
     def test_delete(self):
 
         unittest = self.sample.unittest("unit")
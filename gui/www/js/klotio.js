@@ -6,7 +6,17 @@ DRApp.load = function (name) {
 
 $.ajaxPrefilter(function(options, originalOptions, jqXHR) {});
 
-DRApp.group = $.ajax({url: "/api/group", async: false}).responseJSON.group;
+DRApp.group = JSON.parse(sessionStorage.getItem("klotio.group") || "null");
+
+if (DRApp.group) {
+    $.ajax({url: "/api/group", dataType: "json"}).done(function(data) {
+        DRApp.group = data.group;
+        sessionStorage.setItem("klotio.group", JSON.stringify(data.group));
+    });
+} else {
+    DRApp.group = $.ajax({url: "/api/group", async: false}).responseJSON.group;
+    sessionStorage.setItem("klotio.group", JSON.stringify(DRApp.group));
+}
 
 DRApp.controller("Base",null,{
     rest: function(type,url,data) {
@@ -25,6 +35,7 @@ DRApp.controller("Base",null,{
         return response.responseJSON;
     },
     home: function() {
+        this.unchanges();
         this.application.render(this.it);
     },
     url: function(params) {
@@ -47,6 +58,90 @@ DRApp.controller("Base",null,{
     list: function() {
         this.it = this.rest("GET",this.url());
         this.application.render(this.it);
+        this.changes();
+    },
+    changes: function() {
+        if (this.source || !window.EventSource) {
+            return;
+        }
+        var controller = this;
+        this.source = new EventSource(this.url() + "/changes");
+        ["create", "update", "delete", "resync"].forEach(function(action) {
+            controller.source.addEventListener(action, function(event) {
+                controller.change(JSON.parse(event.data));
+            });
+        });
+        window.addEventListener("hashchange", function() {
+            controller.unchanges();
+        }, {once: true});
+    },
+    unchanges: function() {
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+    },
+    models: function() {
+        if (!this.source || !this.it) {
+            return null;
+        }
+        var it = this.it;
+        var lists = Object.keys(it).filter(function(key) { return Array.isArray(it[key]); });
+        return lists.length == 1 ? it[lists[0]] : null;
+    },
+    reload: function() {
+        var controller = this;
+        if (this.reloading) {
+            this.reloading = "again";
+            return;
+        }
+        this.reloading = true;
+        $.ajax({url: this.url(), dataType: "json"}).done(function(data) {
+            if (controller.models()) {
+                controller.it = data;
+                controller.application.render(controller.it);
+            }
+        }).always(function() {
+            var again = controller.reloading == "again";
+            controller.reloading = false;
+            if (again) {
+                controller.reload();
+            }
+        });
+    },
+    drop: function(id) {
+        var models = this.models();
+        var index = models ? models.findIndex(function(model) { return model.id == id; }) : -1;
+        if (index >= 0) {
+            models.splice(index, 1);
+            this.application.render(this.it);
+        }
+    },
+    change: function(change) {
+        var controller = this;
+        var models = this.models();
+        if (!models) {
+            this.unchanges();
+            return;
+        }
+        if (change.action == "resync" || change.action == "create") {
+            this.reload();
+        } else if (change.action == "delete") {
+            this.drop(change.id);
+        } else if (models.some(function(model) { return model.id == change.id; })) {
+            $.ajax({url: this.url() + "/" + change.id, dataType: "json"}).done(function(data) {
+                var models = controller.models();
+                var index = models ? models.findIndex(function(model) { return model.id == change.id; }) : -1;
+                if (index >= 0) {
+                    models[index] = data[controller.singular];
+                    controller.application.render(controller.it);
+                }
+            }).fail(function(response) {
+                if (response.status == 404) {
+                    controller.drop(change.id);
+                }
+            });
+        }
     },
     fields_change: function() {
         this.it = this.rest("OPTIONS",this.url(), this.fields_request());
@@ -100,6 +195,7 @@ DRApp.controller("Base",null,{
         return request;
     },
     create: function() {
+        this.unchanges();
         this.it = this.rest("OPTIONS",this.url());
         this.application.render(this.it);
     },
@@ -113,10 +209,12 @@ DRApp.controller("Base",null,{
         }
     },
     retrieve: function() {
+        this.unchanges();
         this.it = this.rest("OPTIONS",this.id_url());
         this.application.render(this.it);
     },
     update: function() {
+        this.unchanges();
         this.it = this.rest("OPTIONS",this.id_url());
         this.application.render(this.it);
     },
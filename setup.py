@@ -16,5 +16,10 @@ setup(
         'SQLAlchemy==1.3.18',
         'SQLAlchemy-JSONField==0.9.0',
         'flask_jsontools==0.1.7'
-    ]
+    ],
+    extras_require={
+        'inotify': ['inotify_simple==1.3.5'],
+        'orjson': ['orjson==3.4.0'],
+        'brotli': ['Brotli==1.0.9']
+    }
 )
\ No newline at end of file